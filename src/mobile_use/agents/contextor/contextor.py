@@ -1,5 +1,14 @@
+import asyncio
+import base64
+from typing import Awaitable, Optional, TypeVar
+
 from mobile_use.agents.executor.utils import is_last_tool_message_take_screenshot
-from mobile_use.controllers.mobile_command_controller import get_screen_data
+from mobile_use.clients.screen_api_client import ScreenApiError
+from mobile_use.controllers.async_mobile_command_controller import (
+    get_screen_data,
+    get_screen_diff,
+    take_screenshot,
+)
 from mobile_use.controllers.platform_specific_commands_controller import (
     get_device_date,
     get_focused_app_info,
@@ -7,26 +16,121 @@ from mobile_use.controllers.platform_specific_commands_controller import (
 from mobile_use.graph.state import State
 from mobile_use.utils.decorators import wrap_with_callbacks
 from mobile_use.utils.logger import get_logger
+from mobile_use.utils.ui_hierarchy import normalize_ui_hierarchy
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# Per-source timeouts: a slow source is left out of the context rather than delaying the others
+SCREEN_DATA_TIMEOUT_SECONDS = 30
+# The diff request is tried once with a short timeout: a full refresh is faster than waiting on it
+SCREEN_DIFF_TIMEOUT_SECONDS = 2
+SCREENSHOT_TIMEOUT_SECONDS = 15
+FOCUSED_APP_INFO_TIMEOUT_SECONDS = 5
+DEVICE_DATE_TIMEOUT_SECONDS = 5
+
+
+async def get_context_source(
+    name: str, source: Awaitable[T], timeout_seconds: float
+) -> Optional[T]:
+    """Awaits a context source, None if it fails or does not answer within the timeout."""
+    try:
+        return await asyncio.wait_for(source, timeout=timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(f"Contextor: {name} timed out after {timeout_seconds}s, skipping it")
+    except Exception as e:
+        logger.warning(f"Contextor: could not get {name}, skipping it: {e}")
+    return None
+
+
+async def get_screenshot_base64() -> str:
+    screenshot = await take_screenshot(image_format="jpeg", quality=50)
+    return base64.b64encode(screenshot).decode("utf-8")
+
+
+async def get_no_screenshot() -> None:
+    return None
+
+
+async def get_screen_diff_since(since_seq: int) -> Optional[dict]:
+    """UI hierarchy changes since frame `since_seq`, None if that frame left the history."""
+    try:
+        return await get_screen_diff(since_seq=since_seq)
+    except ScreenApiError as e:
+        if e.status_code != 404:
+            raise
+        logger.info(f"Contextor: frame {since_seq} is no longer in the history, screen changed")
+        return None
+
+
+async def get_unchanged_screen_seq(since_seq: int) -> Optional[int]:
+    """Sequence number of the latest frame if the UI hierarchy did not change since `since_seq`."""
+    diff = await get_context_source(
+        "screen diff", get_screen_diff_since(since_seq), SCREEN_DIFF_TIMEOUT_SECONDS
+    )
+    if diff is None or diff["has_changes"]:
+        return None
+    return diff["seq"]
+
 
 @wrap_with_callbacks(
     before=lambda: logger.info("Starting Contextor Agent"),
     on_success=lambda _: logger.success("Contextor Agent"),
     on_failure=lambda _: logger.error("Contextor Agent"),
 )
-def contextor_node(state: State):
-    device_data = get_screen_data()
-    focused_app_info = get_focused_app_info()
-    device_date = get_device_date()
-
+async def contextor_node(state: State):
     should_add_screenshot_context = is_last_tool_message_take_screenshot(list(state.messages))
+    screenshot_source = (
+        get_screenshot_base64() if should_add_screenshot_context else get_no_screenshot()
+    )
+
+    if state.latest_ui_hierarchy is not None and state.latest_screen_seq is not None:
+        unchanged_seq = await get_unchanged_screen_seq(state.latest_screen_seq)
+        if unchanged_seq is not None:
+            logger.info("Screen unchanged since the latest context, reusing it")
+            device_date, screenshot_base64 = await asyncio.gather(
+                get_context_source(
+                    "device date", asyncio.to_thread(get_device_date), DEVICE_DATE_TIMEOUT_SECONDS
+                ),
+                get_context_source("screenshot", screenshot_source, SCREENSHOT_TIMEOUT_SECONDS),
+            )
+            return {
+                "latest_screenshot_base64": screenshot_base64,
+                "device_date": device_date or state.device_date,
+                "latest_screen_seq": unchanged_seq,
+            }
+
+    # ADB calls are blocking: they run in threads, concurrently with the screen API requests
+    device_data, focused_app_info, device_date, screenshot_base64 = await asyncio.gather(
+        get_context_source(
+            "screen data", get_screen_data(include_screenshot=False), SCREEN_DATA_TIMEOUT_SECONDS
+        ),
+        get_context_source(
+            "focused app info",
+            asyncio.to_thread(get_focused_app_info),
+            FOCUSED_APP_INFO_TIMEOUT_SECONDS,
+        ),
+        get_context_source(
+            "device date", asyncio.to_thread(get_device_date), DEVICE_DATE_TIMEOUT_SECONDS
+        ),
+        get_context_source("screenshot", screenshot_source, SCREENSHOT_TIMEOUT_SECONDS),
+    )
 
-    return {
-        "latest_screenshot_base64": device_data.base64 if should_add_screenshot_context else None,
-        "latest_ui_hierarchy": device_data.elements,
+    latest_ui_hierarchy = None
+    if device_data is not None:
+        # every consumer of the state works with the visible part of the screen; repeated
+        # siblings are only collapsed in the cortex prompt, so that each one keeps its mark
+        latest_ui_hierarchy = normalize_ui_hierarchy(
+            device_data.elements, screen_size=(device_data.width, device_data.height)
+        )
+    updates = {
+        "latest_screenshot_base64": screenshot_base64,
+        "latest_ui_hierarchy": latest_ui_hierarchy,
         "focused_app_info": focused_app_info,
-        "screen_size": (device_data.width, device_data.height),
         "device_date": device_date,
+        "latest_screen_seq": device_data.seq if device_data is not None else None,
     }
+    if device_data is not None:
+        updates["screen_size"] = (device_data.width, device_data.height)
+    return updates
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from mobile_use.agents.contextor import contextor
+from mobile_use.clients.screen_api_client import ScreenApiError
+from mobile_use.controllers.mobile_command_controller import ScreenDataResponse
+from mobile_use.graph.state import State
+
+SCREEN = [{"resourceId": "app:id/login", "text": "Sign in", "bounds": "[0,600][1080,700]"}]
+
+
+@pytest.fixture
+def device(monkeypatch):
+    calls = []
+
+    async def get_screen_data(include_screenshot: bool):
+        calls.append("screen data")
+        return ScreenDataResponse(
+            elements=SCREEN, width=1080, height=2400, platform="ANDROID", seq=9
+        )
+
+    monkeypatch.setattr(contextor, "get_screen_data", get_screen_data)
+    monkeypatch.setattr(contextor, "get_focused_app_info", lambda: "com.example.app")
+    monkeypatch.setattr(contextor, "get_device_date", lambda: "Wed Jun  5 16:03:12 CEST 2024")
+    return calls
+
+
+def get_state() -> State:
+    return State(
+        messages=[],
+        initial_goal="Sign in",
+        subgoal_plan=[],
+        latest_ui_hierarchy=SCREEN,
+        latest_screenshot_base64=None,
+        focused_app_info="com.example.app",
+        device_date=None,
+        latest_screen_seq=4,
+        structured_decisions=None,
+        agents_thoughts=[],
+        remaining_steps=10,
+        executor_retrigger=False,
+        executor_failed=False,
+        executor_messages=[],
+        cortex_last_thought=None,
+    )
+
+
+def test_unchanged_screen_keeps_the_previous_context(monkeypatch, device):
+    async def get_screen_diff(since_seq: int):
+        return {"since": since_seq, "seq": 7, "has_changes": False}
+
+    monkeypatch.setattr(contextor, "get_screen_diff", get_screen_diff)
+
+    updates = asyncio.run(contextor.contextor_node(get_state()))
+
+    assert device == []
+    assert updates["latest_screen_seq"] == 7
+    assert "latest_ui_hierarchy" not in updates
+
+
+def test_screen_is_fetched_again_once_its_frame_left_the_history(monkeypatch, device):
+    async def get_screen_diff(since_seq: int):
+        raise ScreenApiError("Frame 4 is no longer in the history", status_code=404)
+
+    monkeypatch.setattr(contextor, "get_screen_diff", get_screen_diff)
+
+    updates = asyncio.run(contextor.contextor_node(get_state()))
+
+    assert device == ["screen data"]
+    assert updates["latest_screen_seq"] == 9
+    assert updates["latest_ui_hierarchy"] is not None
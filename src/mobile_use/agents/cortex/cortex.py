@@ -1,5 +1,5 @@
-import json
 from pathlib import Path
+from typing import Literal, Optional
 
 from jinja2 import Template
 from langchain_core.messages import (
@@ -12,13 +12,19 @@ from langchain_core.messages import (
 from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from mobile_use.agents.cortex.types import CortexOutput
 from mobile_use.agents.planner.utils import get_current_subgoal
-from mobile_use.config import LLM
+from mobile_use.config import LLM, settings
 from mobile_use.context import get_device_context
 from mobile_use.graph.state import State
 from mobile_use.services.llm import get_llm, with_fallback
 from mobile_use.utils.conversations import get_screenshot_message_for_llm
 from mobile_use.utils.decorators import wrap_with_callbacks
 from mobile_use.utils.logger import get_logger
+from mobile_use.utils.element_ranking import count_elements, select_relevant_elements
+from mobile_use.utils.ui_hierarchy import (
+    collapse_repeated_siblings,
+    compact_ui_hierarchy,
+    format_compact_ui_hierarchy,
+)
 
 logger = get_logger(__name__)
 
@@ -58,13 +64,19 @@ async def cortex_node(state: State):
         messages.append(AIMessage(content=thought))
 
     if state.latest_screenshot_base64:
-        messages.append(get_screenshot_message_for_llm(state.latest_screenshot_base64))
+        messages.append(
+            get_screenshot_message_for_llm(
+                state.latest_screenshot_base64,
+                ui_hierarchy=state.latest_ui_hierarchy if settings.ELEMENT_MARKS else None,
+                screen_size=(device_context.device_width, device_context.device_height),
+            )
+        )
         logger.info("Added screenshot to context")
 
+    ui_hierarchy_view: Optional[UIHierarchyView] = None
     if state.latest_ui_hierarchy:
-        ui_hierarchy_dict: list[dict] = state.latest_ui_hierarchy
-        ui_hierarchy_str = json.dumps(ui_hierarchy_dict, indent=2, ensure_ascii=False)
-        messages.append(HumanMessage(content="Here is the UI hierarchy:\n" + ui_hierarchy_str))
+        ui_hierarchy_message, ui_hierarchy_view = get_ui_hierarchy_message(state)
+        messages.append(ui_hierarchy_message)
 
     llm = get_llm(agent_node="cortex", temperature=1).with_structured_output(CortexOutput)
     llm_fallback = get_llm(
@@ -75,20 +87,89 @@ async def cortex_node(state: State):
         fallback_call=lambda: llm_fallback.ainvoke(messages),
     )  # type: ignore
 
+    if response.expand_ui_hierarchy and ui_hierarchy_view in ("relevant", "collapsed"):
+        logger.info("Cortex asked for the full UI hierarchy")
+        messages[-1], ui_hierarchy_view = get_ui_hierarchy_message(state, expand=True)
+        response: CortexOutput = await with_fallback(
+            main_call=lambda: llm.ainvoke(messages),
+            fallback_call=lambda: llm_fallback.ainvoke(messages),
+        )  # type: ignore
+
     is_subgoal_completed = response.complete_current_subgoal
     return {
         "agents_thoughts": [response.agent_thought],
         "structured_decisions": response.decisions if not is_subgoal_completed else None,
+        # the rest of the device context is kept, for the next step to reuse when still valid
         "latest_screenshot_base64": None,
-        "latest_ui_hierarchy": None,
-        "focused_app_info": None,
-        "device_date": None,
         # Executor related fields
         "executor_messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)],
         "cortex_last_thought": response.agent_thought,
     }
 
 
+UIHierarchyView = Literal["full", "relevant", "collapsed"]
+
+
+def get_ui_hierarchy_message(
+    state: State, expand: bool = False
+) -> tuple[HumanMessage, UIHierarchyView]:
+    """
+    The UI hierarchy message for the cortex, and which view of the current hierarchy it gives.
+    Unless `expand` is set, on screens with more than UI_HIERARCHY_TOP_K elements, only the
+    elements most relevant to the current subgoal and the last thought are given. When none is
+    related to them, the hierarchy is given with its long runs of similar siblings (e.g. list
+    rows) shortened instead (see UI_HIERARCHY_MAX_REPEATED_SIBLINGS). Marks are those of the
+    whole hierarchy either way, as the tools resolve them.
+    """
+    content, view = get_ui_hierarchy_content(state, expand=expand)
+    return HumanMessage(content=content), view
+
+
+def get_ui_hierarchy_content(state: State, expand: bool) -> tuple[str, UIHierarchyView]:
+    expand_hint = "Set `expand_ui_hierarchy` if you need the full hierarchy"
+    compacted = compact_ui_hierarchy(
+        state.latest_ui_hierarchy or [],
+        detail=settings.UI_HIERARCHY_DETAIL,
+        with_marks=settings.ELEMENT_MARKS,
+    )
+    description = (
+        "one element per line, children indented under their parent,"
+        " bounds as [left,top][right,bottom]"
+    )
+    if settings.ELEMENT_MARKS:
+        description += ", #<n> is the mark of an element, to target it with element_ref=<n>"
+    relevant = None
+    if not expand and settings.UI_HIERARCHY_TOP_K > 0:
+        current_subgoal = get_current_subgoal(state.subgoal_plan)
+        subgoal_description = current_subgoal.description if current_subgoal else ""
+        query = f"{subgoal_description} {state.cortex_last_thought or ''}"
+        relevant = select_relevant_elements(compacted, query, top_k=settings.UI_HIERARCHY_TOP_K)
+    if relevant is None:
+        collapsed = compacted
+        if (
+            not expand
+            and settings.UI_HIERARCHY_MAX_REPEATED_SIBLINGS > 0
+            and count_elements(compacted) > settings.UI_HIERARCHY_TOP_K
+        ):
+            collapsed = collapse_repeated_siblings(
+                compacted, settings.UI_HIERARCHY_MAX_REPEATED_SIBLINGS
+            )
+        if count_elements(collapsed) == count_elements(compacted):
+            content = f"Here is the UI hierarchy ({description}):\n"
+            return content + format_compact_ui_hierarchy(compacted), "full"
+        content = (
+            f"Here is the UI hierarchy ({description}), long runs of similar elements shortened."
+            f" {expand_hint}:\n"
+        )
+        return content + format_compact_ui_hierarchy(collapsed), "collapsed"
+    content = (
+        "Here are the elements of the UI hierarchy most relevant to the current subgoal"
+        f" ({count_elements(relevant)} out of {count_elements(compacted)}), with their parents"
+        f" ({description}). {expand_hint}:\n"
+    )
+    return content + format_compact_ui_hierarchy(relevant), "relevant"
+
+
 def get_executor_agent_feedback(state: State) -> str:
     if state.structured_decisions is None:
         return "None."
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from mobile_use.agents.cortex import cortex
+from mobile_use.agents.cortex.types import CortexOutput
+from mobile_use.agents.planner.types import Subgoal, SubgoalStatus
+from mobile_use.context import DeviceContext, device_context
+from mobile_use.graph.state import State
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts: list[list] = []
+        self.expand_ui_hierarchy = False
+
+    def with_structured_output(self, schema):
+        return self
+
+    async def ainvoke(self, messages):
+        self.prompts.append(list(messages))
+        expand = self.expand_ui_hierarchy and len(self.prompts) == 1
+        return CortexOutput(
+            decisions="{}", agent_thought="Tapping on sign in", expand_ui_hierarchy=expand
+        )
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    recording_llm = RecordingLLM()
+    monkeypatch.setattr(cortex, "get_llm", lambda **kwargs: recording_llm)
+    token = device_context.set(
+        DeviceContext(
+            host_platform="LINUX",
+            mobile_platform="ANDROID",
+            device_id="emulator-5554",
+            device_width=1080,
+            device_height=2400,
+        )
+    )
+    yield recording_llm
+    device_context.reset(token)
+
+
+def get_state(latest_ui_hierarchy: list, subgoal: str = "Sign in") -> State:
+    return State(
+        messages=[],
+        initial_goal=subgoal,
+        subgoal_plan=[Subgoal(description=subgoal, status=SubgoalStatus.PENDING)],
+        latest_ui_hierarchy=latest_ui_hierarchy,
+        latest_screenshot_base64=None,
+        focused_app_info=None,
+        device_date=None,
+        latest_screen_seq=2,
+        structured_decisions=None,
+        agents_thoughts=[],
+        remaining_steps=10,
+        executor_retrigger=False,
+        executor_failed=False,
+        executor_messages=[],
+        cortex_last_thought=None,
+    )
+
+
+def get_screen(button_text: str) -> list[dict]:
+    return [
+        {"resourceId": "app:id/title", "text": "Welcome", "bounds": "[0,0][1080,200]"},
+        {"resourceId": "app:id/email", "hintText": "Email", "bounds": "[0,300][1080,400]"},
+        {"resourceId": "app:id/password", "hintText": "Password", "bounds": "[0,400][1080,500]"},
+        {"resourceId": "app:id/remember", "text": "Remember me", "bounds": "[0,500][1080,600]"},
+        {
+            "resourceId": "app:id/login",
+            "text": button_text,
+            "clickable": True,
+            "bounds": "[0,600][1080,700]",
+        },
+    ]
+
+
+def test_prompt_describes_the_current_screen(llm):
+    asyncio.run(cortex.cortex_node(get_state(get_screen("Signing in..."))))
+
+    prompt = llm.prompts[-1][-1].content
+    assert '"Welcome"' in prompt
+    assert '#5 "Signing in..." id=app:id/login clickable [0,600][1080,700]' in prompt
+
+
+def get_list_screen(nb_rows: int) -> list[dict]:
+    return [
+        {
+            "resourceId": "app:id/list",
+            "bounds": "[0,0][1080,2400]",
+            "children": [
+                {
+                    "resourceId": "app:id/row",
+                    "text": f"Item {index}",
+                    "clickable": True,
+                    "bounds": f"[0,{index * 40}][1080,{index * 40 + 40}]",
+                }
+                for index in range(nb_rows)
+            ],
+        }
+    ]
+
+
+def test_repeated_rows_are_only_collapsed_in_the_prompt(llm):
+    llm.expand_ui_hierarchy = True
+    state = get_state(get_list_screen(50))
+
+    asyncio.run(cortex.cortex_node(state))
+
+    collapsed_prompt, expanded_prompt = (prompts[-1].content for prompts in llm.prompts)
+    assert '#11 "Item 9"' in collapsed_prompt and '"Item 10"' not in collapsed_prompt
+    assert "... 40 more elements like the previous ones" in collapsed_prompt
+    # the marks of the collapsed rows are still those the tools resolve
+    assert '#51 "Item 49"' in expanded_prompt and "more elements" not in expanded_prompt
+
+
+def test_relevant_rows_are_never_collapsed(llm):
+    state = get_state(get_list_screen(50), subgoal="Open Item 42")
+
+    asyncio.run(cortex.cortex_node(state))
+
+    prompt = llm.prompts[-1][-1].content
+    assert '#44 "Item 42"' in prompt and "more elements" not in prompt
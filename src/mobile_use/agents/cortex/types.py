@@ -9,3 +9,8 @@ class CortexOutput(BaseModel):
     complete_current_subgoal: Optional[bool] = Field(
         False, description="Whether the current subgoal is complete"
     )
+    expand_ui_hierarchy: Optional[bool] = Field(
+        False,
+        description="Set to request the full UI hierarchy, when only part of it was given and the"
+        " element you need is not in it",
+    )
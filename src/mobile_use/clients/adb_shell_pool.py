@@ -0,0 +1,125 @@
+import atexit
+import queue
+import threading
+import uuid
+from typing import Optional
+
+from adbutils import AdbDevice, AdbError
+from mobile_use.clients.adb_client import adb
+from mobile_use.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Shell sessions kept open per device, i.e. the number of commands it can run concurrently
+ADB_SHELL_POOL_SIZE = 2
+ADB_SHELL_TIMEOUT_SECONDS = 30
+_END_MARKER_PREFIX = "__MOBILE_USE_END_"
+
+_devices: dict[str, AdbDevice] = {}
+_pools: dict[str, "AdbShellPool"] = {}
+_registry_lock = threading.Lock()
+
+
+class AdbShellOutputError(AdbError):
+    """The command was sent but its output was not received: it may or may not have run."""
+
+
+class AdbShellSession:
+    """
+    A long-lived `sh` process on the device, running one command at a time.
+    Each command is followed by a unique end marker, which delimits its output on the stream.
+    """
+
+    def __init__(self, device: AdbDevice):
+        self._connection = device.open_shell("sh")
+
+    def send(self, command: str, timeout_seconds: float) -> bytes:
+        """Sends the command, returns the end marker to read its output up to."""
+        marker = f"{_END_MARKER_PREFIX}{uuid.uuid4().hex}"
+        # stdin is kept for the next commands, stderr is merged as with `adb shell`
+        script = f"{{ {command} ; }} </dev/null 2>&1; echo; echo {marker}\n"
+        self._connection.conn.settimeout(timeout_seconds)
+        self._connection.send(script.encode("utf-8"))
+        return f"\n{marker}\n".encode()
+
+    def read_output(self, end: bytes) -> str:
+        buffer = b""
+        while end not in buffer:
+            chunk = self._connection.recv(4096)
+            if not chunk:
+                raise AdbError("Shell session closed by the device")
+            buffer += chunk
+        return buffer[: buffer.index(end)].decode("utf-8", errors="replace").rstrip()
+
+    def close(self):
+        self._connection.close()
+
+
+class AdbShellPool:
+    """
+    Shell sessions of a single device, opened on demand and reused across commands.
+    Concurrent commands are spread over up to `size` sessions.
+    A command whose session breaks before it is sent runs over a one-off `adb shell` connection
+    instead. Once sent, it is never run again: a failure to read its output (timeout, closed
+    session) raises AdbShellOutputError, since the command may already have had its effect.
+    """
+
+    def __init__(self, device: AdbDevice, size: int = ADB_SHELL_POOL_SIZE):
+        self.device = device
+        self._idle: queue.LifoQueue[AdbShellSession] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def run(self, command: str, timeout_seconds: float = ADB_SHELL_TIMEOUT_SECONDS) -> str:
+        with self._slots:
+            session: Optional[AdbShellSession] = None
+            try:
+                session = self._take_session()
+                end = session.send(command, timeout_seconds)
+            except (AdbError, OSError) as e:
+                if session is not None:
+                    session.close()
+                logger.warning(f"ADB shell session failed, running `{command}` directly: {e}")
+                return self.device.shell(command, timeout=timeout_seconds)  # type: ignore
+            try:
+                output = session.read_output(end)
+            except (AdbError, OSError) as e:
+                session.close()
+                raise AdbShellOutputError(f"No output for `{command}`: {e}") from e
+            self._idle.put(session)
+            return output
+
+    def _take_session(self) -> AdbShellSession:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return AdbShellSession(self.device)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def get_shell_pool(serial: str) -> AdbShellPool:
+    with _registry_lock:
+        pool = _pools.get(serial)
+        if pool is None:
+            pool = _pools[serial] = AdbShellPool(_get_device(serial))
+        return pool
+
+
+def _get_device(serial: str) -> AdbDevice:
+    device = _devices.get(serial)
+    if device is None:
+        device = _devices[serial] = adb.device(serial=serial)
+    return device
+
+
+def close_shell_pools():
+    """Closes the idle sessions of every pool, the device `sh` processes exit with them."""
+    with _registry_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+atexit.register(close_shell_pools)
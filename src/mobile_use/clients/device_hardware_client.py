@@ -1,6 +1,10 @@
 from urllib.parse import urljoin
 
-from mobile_use.utils.requests_utils import get_session_with_curl_logging
+import httpx
+from mobile_use.utils.requests_utils import get_session_with_curl_logging, log_async_response
+
+# Maestro commands (e.g. waiting for an element) can take a while
+ASYNC_CLIENT_TIMEOUT_SECONDS = 120
 
 
 class DeviceHardwareClient:
@@ -17,7 +21,35 @@ class DeviceHardwareClient:
         return self.session.post(url, **kwargs)
 
 
+class AsyncDeviceHardwareClient:
+    """Async counterpart of DeviceHardwareClient, on a pooled httpx.AsyncClient."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(ASYNC_CLIENT_TIMEOUT_SECONDS),
+            event_hooks={"response": [log_async_response]},
+        )
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        url = urljoin(self.base_url, f"/api/{path.lstrip('/')}")
+        return await self.client.get(url, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        url = urljoin(self.base_url, f"/api/{path.lstrip('/')}")
+        return await self.client.post(url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
 def get_client(base_url: str | None = None):
     if not base_url:
         base_url = "http://localhost:9999"
     return DeviceHardwareClient(base_url)
+
+
+def get_async_client(base_url: str | None = None):
+    if not base_url:
+        base_url = "http://localhost:9999"
+    return AsyncDeviceHardwareClient(base_url)
@@ -1,50 +1,208 @@
+import asyncio
 import os
 import time
-from urllib.parse import urljoin
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+from urllib.parse import quote, urljoin
 
+import httpx
 import requests
 from mobile_use.utils.logger import get_logger
-from mobile_use.utils.requests_utils import get_session_with_curl_logging
+from mobile_use.utils.requests_utils import get_session_with_curl_logging, log_async_response
 
 logger = get_logger(__name__)
 
+# Number of responses kept for ETag revalidation
+MAX_CACHED_RESPONSES = 8
+# The screen API long-polls for up to 30 s
+ASYNC_CLIENT_TIMEOUT_SECONDS = 60
 
-class ScreenApiClient:
-    def __init__(self, base_url: str, retry_count: int = 5, retry_wait_seconds: int = 1):
+ResponseT = TypeVar("ResponseT", requests.Response, httpx.Response)
+
+
+class ScreenApiError(Exception):
+    """The screen API kept answering with an error status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        self.message = message
+        self.status_code = status_code
+
+    def __str__(self):
+        return self.message
+
+
+class BaseScreenApiClient(Generic[ResponseT]):
+    """
+    Transport-independent part of the screen API clients: routes, retry settings, and the
+    responses kept for ETag revalidation.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        retry_count: int = 5,
+        retry_wait_seconds: int = 1,
+        device_id: Optional[str] = None,
+    ):
         self.base_url = base_url
-        self.session = get_session_with_curl_logging()
+        # on a multi-device screen API, routes are served under /devices/{device_id}
+        self.path_prefix = f"/devices/{quote(device_id, safe='')}" if device_id else ""
         self.retry_count = retry_count
         self.retry_wait_seconds = retry_wait_seconds
+        self._cached_responses: OrderedDict[str, ResponseT] = OrderedDict()
+
+    def _get_url(self, path: str) -> str:
+        return urljoin(self.base_url, f"{self.path_prefix}/{path.lstrip('/')}")
+
+    def _get_request_headers(self, cache_key: str, request_headers: dict) -> dict:
+        headers = dict(request_headers)
+        cached_response = self._cached_responses.get(cache_key)
+        if cached_response is not None:
+            headers["If-None-Match"] = cached_response.headers["ETag"]
+        return headers
+
+    def _get_valid_response(self, cache_key: str, response: ResponseT) -> Optional[ResponseT]:
+        """
+        The response to return for a request, None if it is an error to retry.
+        On 304, the kept response is returned with its headers refreshed.
+        """
+        cached_response = self._cached_responses.get(cache_key)
+        if response.status_code == 304 and cached_response is not None:
+            cached_response.headers.update(response.headers)
+            self._cached_responses.move_to_end(cache_key)
+            return cached_response
+        if 200 <= response.status_code < 300:
+            self._cache_response(cache_key, response)
+            return response
+        return None
+
+    def _cache_response(self, cache_key: str, response: ResponseT):
+        if "ETag" not in response.headers:
+            self._cached_responses.pop(cache_key, None)
+            return
+        self._cached_responses[cache_key] = response
+        self._cached_responses.move_to_end(cache_key)
+        while len(self._cached_responses) > MAX_CACHED_RESPONSES:
+            self._cached_responses.popitem(last=False)
+
+
+def log_failed_attempt(status_code: int, attempt: int, retry_count: int):
+    logger.warning(f"Received {status_code}, attempt {attempt + 1} of {retry_count}.")
+
+
+def get_retries_exhausted_error(status_code: Optional[int], retry_count: int) -> ScreenApiError:
+    return ScreenApiError(
+        f"Failed to get a valid response after {retry_count} attempts (status {status_code}).",
+        status_code=status_code,
+    )
 
-    def get(self, path: str, **kwargs):
-        for attempt in range(self.retry_count):
-            try:
-                response = self.session.get(urljoin(self.base_url, path), **kwargs)
-                if 200 <= response.status_code and response.status_code < 300:
-                    return response
-
-                logger.warning(
-                    f"Received {response.status_code}, attempt {attempt + 1} of {self.retry_count}."
-                    f" Retrying in {self.retry_wait_seconds} seconds..."
-                )
-                time.sleep(self.retry_wait_seconds)
 
-            except requests.exceptions.RequestException as e:
-                if attempt == self.retry_count - 1:
-                    raise e
+class ScreenApiClient(BaseScreenApiClient[requests.Response]):
+    def __init__(
+        self,
+        base_url: str,
+        retry_count: int = 5,
+        retry_wait_seconds: int = 1,
+        device_id: Optional[str] = None,
+    ):
+        super().__init__(base_url, retry_count, retry_wait_seconds, device_id=device_id)
+        self.session = get_session_with_curl_logging()
+        # the screen API compresses bodies with gzip only
+        self.session.headers["Accept-Encoding"] = "gzip"
+
+    def get(self, path: str, retry_count: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        GET with retries (`retry_count` attempts, the client's by default).
+        Responses carrying an ETag are kept and revalidated with If-None-Match on the next call.
+        Raises ScreenApiError when every attempt was answered with an error status.
+        """
+        url = self._get_url(path)
+        cache_key = requests.Request("GET", url, params=kwargs.get("params")).prepare().url or url
+        request_headers = kwargs.pop("headers", None) or {}
+        retry_count = retry_count or self.retry_count
+        status_code = None
+        for attempt in range(retry_count):
+            if attempt > 0:
                 time.sleep(self.retry_wait_seconds)
+            headers = self._get_request_headers(cache_key, request_headers)
+            try:
+                response = self.session.get(url, headers=headers, **kwargs)
+            except requests.exceptions.RequestException:
+                if attempt == retry_count - 1:
+                    raise
+                continue
+            valid_response = self._get_valid_response(cache_key, response)
+            if valid_response is not None:
+                return valid_response
+            status_code = response.status_code
+            log_failed_attempt(status_code, attempt, retry_count)
+        raise get_retries_exhausted_error(status_code, retry_count)
+
+    def post(self, path: str, **kwargs):
+        return self.session.post(self._get_url(path), **kwargs)
 
-        raise requests.exceptions.RequestException(
-            f"Failed to get a valid response after {self.retry_count} attempts."
+
+class AsyncScreenApiClient(BaseScreenApiClient[httpx.Response]):
+    """
+    Async counterpart of ScreenApiClient, on a pooled httpx.AsyncClient.
+    Same retries and ETag revalidation; gzip bodies are decoded by httpx.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        retry_count: int = 5,
+        retry_wait_seconds: int = 1,
+        device_id: Optional[str] = None,
+    ):
+        super().__init__(base_url, retry_count, retry_wait_seconds, device_id=device_id)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(ASYNC_CLIENT_TIMEOUT_SECONDS),
+            event_hooks={"response": [log_async_response]},
         )
 
-    def post(self, path: str, **kwargs):
-        return self.session.post(urljoin(self.base_url, path), **kwargs)
+    async def get(self, path: str, retry_count: Optional[int] = None, **kwargs) -> httpx.Response:
+        """See ScreenApiClient.get."""
+        url = self._get_url(path)
+        cache_key = str(httpx.URL(url, params=kwargs.get("params")))
+        request_headers = kwargs.pop("headers", None) or {}
+        retry_count = retry_count or self.retry_count
+        status_code = None
+        for attempt in range(retry_count):
+            if attempt > 0:
+                await asyncio.sleep(self.retry_wait_seconds)
+            headers = self._get_request_headers(cache_key, request_headers)
+            try:
+                response = await self.client.get(url, headers=headers, **kwargs)
+            except httpx.HTTPError:
+                if attempt == retry_count - 1:
+                    raise
+                continue
+            valid_response = self._get_valid_response(cache_key, response)
+            if valid_response is not None:
+                return valid_response
+            status_code = response.status_code
+            log_failed_attempt(status_code, attempt, retry_count)
+        raise get_retries_exhausted_error(status_code, retry_count)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.client.post(self._get_url(path), **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def get_client(base_url: str | None = None, device_id: str | None = None):
+    if not base_url:
+        base_url = "http://localhost:9998"
+    retry_count = int(os.getenv("MOBILE_USE_HEALTH_RETRIES", 5))
+    retry_wait_seconds = int(os.getenv("MOBILE_USE_HEALTH_DELAY", 1))
+    return ScreenApiClient(base_url, retry_count, retry_wait_seconds, device_id=device_id)
 
 
-def get_client(base_url: str | None = None):
+def get_async_client(base_url: str | None = None, device_id: str | None = None):
     if not base_url:
         base_url = "http://localhost:9998"
     retry_count = int(os.getenv("MOBILE_USE_HEALTH_RETRIES", 5))
     retry_wait_seconds = int(os.getenv("MOBILE_USE_HEALTH_DELAY", 1))
-    return ScreenApiClient(base_url, retry_count, retry_wait_seconds)
+    return AsyncScreenApiClient(base_url, retry_count, retry_wait_seconds, device_id=device_id)
@@ -0,0 +1,89 @@
+import re
+
+import pytest
+from adbutils import AdbError
+from mobile_use.clients.adb_shell_pool import AdbShellOutputError, AdbShellPool
+
+
+class FakeShellConnection:
+    """Runs each framed script by echoing its command's output, then the end marker."""
+
+    def __init__(self, device: "FakeDevice"):
+        self.device = device
+        self.conn = self
+        self.pending = b""
+        self.closed = False
+
+    def settimeout(self, timeout_seconds: float):
+        pass
+
+    def send(self, script: bytes):
+        if self.device.fail_on_send:
+            raise OSError("Broken pipe")
+        command, marker = re.fullmatch(
+            r"\{ (.*) ; \} </dev/null 2>&1; echo; echo (\S+)\n", script.decode()
+        ).groups()
+        self.device.session_commands.append(command)
+        # the output arrives in several chunks, as over a socket
+        self.pending += f"output of {command}\n\n{marker}\n".encode()
+
+    def recv(self, size: int) -> bytes:
+        if self.device.fail_on_recv:
+            raise TimeoutError("timed out")
+        chunk, self.pending = self.pending[:5], self.pending[5:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDevice:
+    def __init__(self):
+        self.connections: list[FakeShellConnection] = []
+        self.session_commands: list[str] = []
+        self.direct_commands: list[str] = []
+        self.fail_on_send = False
+        self.fail_on_recv = False
+
+    def open_shell(self, command: str) -> FakeShellConnection:
+        self.connections.append(FakeShellConnection(self))
+        return self.connections[-1]
+
+    def shell(self, command: str, timeout: float) -> str:
+        self.direct_commands.append(command)
+        return f"direct output of {command}"
+
+
+def test_commands_reuse_one_session_and_get_their_own_output():
+    device = FakeDevice()
+    pool = AdbShellPool(device)  # type: ignore
+
+    assert pool.run("getprop ro.product.model") == "output of getprop ro.product.model"
+    assert pool.run("date") == "output of date"
+
+    assert len(device.connections) == 1
+    assert device.session_commands == ["getprop ro.product.model", "date"]
+
+
+def test_command_not_sent_runs_over_a_direct_shell():
+    device = FakeDevice()
+    device.fail_on_send = True
+    pool = AdbShellPool(device)  # type: ignore
+
+    assert pool.run("date") == "direct output of date"
+    assert device.direct_commands == ["date"]
+    assert device.connections[0].closed
+
+
+def test_sent_command_without_output_is_never_run_again():
+    device = FakeDevice()
+    device.fail_on_recv = True
+    pool = AdbShellPool(device)  # type: ignore
+
+    with pytest.raises(AdbShellOutputError) as error:
+        pool.run("input tap 10 20")
+
+    assert isinstance(error.value, AdbError)
+    assert device.session_commands == ["input tap 10 20"]
+    assert device.direct_commands == []
+    assert device.connections[0].closed
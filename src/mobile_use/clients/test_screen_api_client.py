@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+from mobile_use.clients.screen_api_client import AsyncScreenApiClient, ScreenApiError
+
+
+class ScreenApi:
+    """Serves one ETag-tagged body, recording the requests it receives."""
+
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.status_code != 200:
+            return httpx.Response(self.status_code)
+        if request.headers.get("If-None-Match") == 'W/"1"':
+            return httpx.Response(304, headers={"ETag": 'W/"1"', "X-Screen-Seq": "2"})
+        return httpx.Response(200, json={"seq": 1}, headers={"ETag": 'W/"1"', "X-Screen-Seq": "1"})
+
+
+def get_client(screen_api: ScreenApi, **kwargs) -> AsyncScreenApiClient:
+    client = AsyncScreenApiClient("http://screen-api", retry_wait_seconds=0, **kwargs)
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(screen_api))
+    return client
+
+
+def test_unchanged_response_is_revalidated_instead_of_downloaded_again():
+    screen_api = ScreenApi()
+    client = get_client(screen_api, device_id="emulator-5554")
+
+    async def get_twice():
+        await client.get("/screen-info", params={"include_screenshot": False})
+        return await client.get("/screen-info", params={"include_screenshot": False})
+
+    response = asyncio.run(get_twice())
+
+    assert response.json() == {"seq": 1}
+    assert response.headers["X-Screen-Seq"] == "2"
+    assert [request.url.path for request in screen_api.requests] == [
+        "/devices/emulator-5554/screen-info"
+    ] * 2
+    assert "If-None-Match" not in screen_api.requests[0].headers
+    assert screen_api.requests[1].headers["If-None-Match"] == 'W/"1"'
+
+
+def test_error_status_is_raised_with_its_code_once_retries_are_exhausted():
+    screen_api = ScreenApi(status_code=404)
+    client = get_client(screen_api)
+
+    with pytest.raises(ScreenApiError) as error:
+        asyncio.run(client.get("/screen-info/diff", retry_count=2, params={"since": 1}))
+
+    assert error.value.status_code == 404
+    assert len(screen_api.requests) == 2
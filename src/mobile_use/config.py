@@ -23,7 +23,36 @@ class Settings(BaseSettings):
     OPEN_ROUTER_API_KEY: Optional[SecretStr] = None
 
     DEVICE_SCREEN_API_BASE_URL: Optional[str] = None
+    # Device id registered on a multi-device screen API, default device if unset
+    DEVICE_SCREEN_API_DEVICE_ID: Optional[str] = None
     DEVICE_HARDWARE_BRIDGE_BASE_URL: Optional[str] = None
+    # Submit multi-step flows to the bridge in one request, rather than one request per step
+    DEVICE_HARDWARE_BRIDGE_BATCH_FLOWS: bool = True
+    # After an action, wait until the screen has not changed for this long (capped by the timeout)
+    SCREEN_SETTLE_WINDOW_MS: int = 300
+    SCREEN_SETTLE_TIMEOUT_MS: int = 2000
+    # Stop waiting sooner when no new frame comes once the action returned: the screen is still
+    SCREEN_SETTLE_GRACE_MS: int = 1000
+    # Resolve id/text selectors to coordinates from the latest frame instead of asking Maestro,
+    # as long as that frame is recent enough
+    LOCAL_SELECTOR_RESOLUTION: bool = False
+    LOCAL_SELECTOR_MAX_FRAME_AGE_MS: int = 2000
+    # Android actions performed through `adb shell input` rather than Maestro, among:
+    # tap, long_press, swipe, press_key, back, input_text (e.g. '["tap", "swipe"]')
+    ADB_INPUT_ACTIONS: list[str] = []
+    # The device time is derived from the host clock, re-synced with the device this often
+    DEVICE_CLOCK_RESYNC_SECONDS: int = 600
+    # Element properties kept in the UI hierarchy given to the cortex: minimal, standard or full
+    UI_HIERARCHY_DETAIL: Literal["minimal", "standard", "full"] = "standard"
+    # Above this many elements, the cortex only gets the ones most relevant to the current
+    # subgoal (0 to always give them all)
+    UI_HIERARCHY_TOP_K: int = 40
+    # Number the actionable elements in the UI hierarchy and on screenshots, so that they can
+    # be targeted by number (element_ref)
+    ELEMENT_MARKS: bool = True
+    # Consecutive same-shaped siblings (e.g. list rows) kept in the full UI hierarchy given to
+    # the cortex, the next ones are summarized by their count (0 to keep them all)
+    UI_HIERARCHY_MAX_REPEATED_SIBLINGS: int = 10
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
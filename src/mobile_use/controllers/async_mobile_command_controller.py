@@ -0,0 +1,173 @@
+"""
+Async variant of mobile_command_controller, for LangGraph nodes and tools.
+Same commands and return values, running the same operations over pooled async HTTP clients so
+that device round trips do not block the event loop.
+"""
+
+import asyncio
+from typing import Optional
+
+from mobile_use.clients.device_hardware_client import (
+    get_async_client as get_async_device_hardware_client,
+)
+from mobile_use.clients.screen_api_client import get_async_client as get_async_screen_api_client
+from mobile_use.config import settings
+from mobile_use.controllers.mobile_command_controller import (
+    DeviceCall,
+    Key,
+    Operation,
+    OperationResult,
+    RunCommandCall,
+    ScreenApiCall,
+    ScreenDataResponse,
+    SelectorRequest,
+    SwipeRequest,
+    WaitTimeout,
+    back_operation,
+    copy_text_from_operation,
+    erase_text_operation,
+    get_latest_screen_seq_operation,
+    get_screen_data_operation,
+    get_screen_diff_operation,
+    input_text_operation,
+    launch_app_operation,
+    long_press_on_operation,
+    open_link_operation,
+    paste_text_operation,
+    press_key_operation,
+    run_flow_operation,
+    stop_app_operation,
+    swipe_operation,
+    take_screenshot_operation,
+    tap_operation,
+    wait_for_animation_to_end_operation,
+    wait_for_screen_to_settle_operation,
+)
+from mobile_use.utils.media import ImageFormat
+
+screen_api = get_async_screen_api_client(
+    settings.DEVICE_SCREEN_API_BASE_URL, device_id=settings.DEVICE_SCREEN_API_DEVICE_ID
+)
+device_hardware_api = get_async_device_hardware_client(settings.DEVICE_HARDWARE_BRIDGE_BASE_URL)
+
+
+async def run_operation(operation: Operation[OperationResult]) -> OperationResult:
+    """See mobile_command_controller.run_operation."""
+    try:
+        call = next(operation)
+        while True:
+            try:
+                result = await perform_device_call(call)
+            except Exception as e:
+                call = operation.throw(e)
+            else:
+                call = operation.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def perform_device_call(call: DeviceCall):
+    if isinstance(call, ScreenApiCall):
+        return await screen_api.get(call.path, **call.get_request_kwargs())
+    if isinstance(call, RunCommandCall):
+        return await device_hardware_api.post("run-command", json=call.payload)
+    # direct input goes through a blocking adb shell
+    return await asyncio.to_thread(call.input_action)
+
+
+###### Screen elements retrieval ######
+
+
+async def get_screen_data(
+    after_seq: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+    include_screenshot: bool = True,
+) -> ScreenDataResponse:
+    return await run_operation(get_screen_data_operation(after_seq, timeout_ms, include_screenshot))
+
+
+async def get_latest_screen_seq() -> int:
+    return await run_operation(get_latest_screen_seq_operation())
+
+
+async def wait_for_screen_to_settle(
+    after_seq: Optional[int] = None,
+    window_ms: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+) -> bool:
+    return await run_operation(
+        wait_for_screen_to_settle_operation(after_seq, window_ms, timeout_ms)
+    )
+
+
+async def get_screen_diff(since_seq: int, seq: Optional[int] = None) -> dict:
+    return await run_operation(get_screen_diff_operation(since_seq, seq))
+
+
+async def take_screenshot(
+    image_format: ImageFormat = "png", quality: int = 80, max_size: Optional[int] = None
+) -> bytes:
+    return await run_operation(take_screenshot_operation(image_format, quality, max_size))
+
+
+async def run_flow(flow_steps: list, dry_run: bool = False) -> Optional[dict]:
+    return await run_operation(run_flow_operation(flow_steps, dry_run))
+
+
+###### Commands ######
+
+
+async def tap(
+    selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None
+):
+    return await run_operation(tap_operation(selector_request, dry_run, index))
+
+
+async def long_press_on(
+    selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None
+):
+    return await run_operation(long_press_on_operation(selector_request, dry_run, index))
+
+
+async def swipe(swipe_request: SwipeRequest, dry_run: bool = False):
+    return await run_operation(swipe_operation(swipe_request, dry_run))
+
+
+async def input_text(text: str, dry_run: bool = False):
+    return await run_operation(input_text_operation(text, dry_run))
+
+
+async def copy_text_from(selector_request: SelectorRequest, dry_run: bool = False):
+    return await run_operation(copy_text_from_operation(selector_request, dry_run))
+
+
+async def paste_text(dry_run: bool = False):
+    return await run_operation(paste_text_operation(dry_run))
+
+
+async def erase_text(nb_chars: Optional[int] = None, dry_run: bool = False):
+    return await run_operation(erase_text_operation(nb_chars, dry_run))
+
+
+async def launch_app(package_name: str, dry_run: bool = False):
+    return await run_operation(launch_app_operation(package_name, dry_run))
+
+
+async def stop_app(package_name: Optional[str] = None, dry_run: bool = False):
+    return await run_operation(stop_app_operation(package_name, dry_run))
+
+
+async def open_link(url: str, dry_run: bool = False):
+    return await run_operation(open_link_operation(url, dry_run))
+
+
+async def back(dry_run: bool = False):
+    return await run_operation(back_operation(dry_run))
+
+
+async def press_key(key: Key, dry_run: bool = False):
+    return await run_operation(press_key_operation(key, dry_run))
+
+
+async def wait_for_animation_to_end(timeout: Optional[WaitTimeout] = None, dry_run: bool = False):
+    return await run_operation(wait_for_animation_to_end_operation(timeout, dry_run))
@@ -0,0 +1,85 @@
+"""
+Input backends performing primitive actions (taps, swipes, key presses, text entry) directly on
+the device, bypassing Maestro's per-command overhead.
+Maestro remains the default: a backend is only used for the action types listed in
+ADB_INPUT_ACTIONS, and the controller falls back to Maestro whenever it fails.
+"""
+
+import shlex
+from abc import ABC, abstractmethod
+from typing import Literal, Optional
+
+from mobile_use.clients.adb_shell_pool import get_shell_pool
+from mobile_use.config import settings
+from mobile_use.context import device_context
+
+InputActionType = Literal["tap", "long_press", "swipe", "press_key", "back", "input_text"]
+
+LONG_PRESS_DURATION_SECONDS = 1.0
+DEFAULT_SWIPE_DURATION_MS = 400
+# Android key codes
+KEYCODE_HOME = 3
+KEYCODE_BACK = 4
+KEYCODE_ENTER = 66
+
+
+class InputBackend(ABC):
+    @abstractmethod
+    def tap(self, x: int, y: int): ...
+
+    @abstractmethod
+    def long_press(self, x: int, y: int): ...
+
+    @abstractmethod
+    def swipe(self, start: tuple[int, int], end: tuple[int, int], duration_ms: int): ...
+
+    @abstractmethod
+    def press_keycode(self, keycode: int): ...
+
+    @abstractmethod
+    def input_text(self, text: str): ...
+
+    def supports_text(self, text: str) -> bool:
+        return True
+
+
+class AdbInputBackend(InputBackend):
+    """Android input through `input` commands, run over the pooled ADB shell sessions."""
+
+    def __init__(self, serial: str):
+        self.shell_pool = get_shell_pool(serial)
+
+    def tap(self, x: int, y: int):
+        self.shell_pool.run(f"input tap {x} {y}")
+
+    def long_press(self, x: int, y: int):
+        # a swipe that does not move is a long press
+        duration_ms = int(LONG_PRESS_DURATION_SECONDS * 1000)
+        self.shell_pool.run(f"input swipe {x} {y} {x} {y} {duration_ms}")
+
+    def swipe(self, start: tuple[int, int], end: tuple[int, int], duration_ms: int):
+        self.shell_pool.run(f"input swipe {start[0]} {start[1]} {end[0]} {end[1]} {duration_ms}")
+
+    def press_keycode(self, keycode: int):
+        self.shell_pool.run(f"input keyevent {keycode}")
+
+    def input_text(self, text: str):
+        # `input text` reads spaces as %s, the quoting is for the device shell
+        self.shell_pool.run(f"input text {shlex.quote(text.replace(' ', '%s'))}")
+
+    def supports_text(self, text: str) -> bool:
+        # `input text` only types printable ASCII, and would type a literal %s as a space
+        return text.isascii() and text.isprintable() and "%s" not in text
+
+
+def get_input_backend(action_type: InputActionType) -> Optional[InputBackend]:
+    """
+    Backend to use for the given action type, None when Maestro should perform it:
+    action type not listed in ADB_INPUT_ACTIONS, not an Android device, or no device context.
+    """
+    if action_type not in settings.ADB_INPUT_ACTIONS:
+        return None
+    context = device_context.get()
+    if context is None or context.mobile_platform != "ANDROID":
+        return None
+    return AdbInputBackend(serial=context.device_id)
@@ -1,41 +1,305 @@
+import asyncio
+import json
+import re
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from enum import Enum
-from typing import Literal, Optional, Union
-
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Generator,
+    Iterator,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+import httpx
+import orjson
+import requests
 import yaml
 from langgraph.types import Command
-from pydantic import BaseModel, ConfigDict, Field
-from requests import JSONDecodeError
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
+from mobile_use.clients.adb_shell_pool import AdbShellOutputError
 from mobile_use.clients.device_hardware_client import get_client as get_device_hardware_client
 from mobile_use.clients.screen_api_client import get_client as get_screen_api_client
 from mobile_use.config import settings
+from mobile_use.context import device_context
+from mobile_use.controllers.input_backend import (
+    DEFAULT_SWIPE_DURATION_MS,
+    KEYCODE_BACK,
+    KEYCODE_ENTER,
+    KEYCODE_HOME,
+    get_input_backend,
+)
 from mobile_use.utils.errors import ControllerErrors
 from mobile_use.utils.logger import get_logger
-
-screen_api = get_screen_api_client(settings.DEVICE_SCREEN_API_BASE_URL)
+from mobile_use.utils.media import ImageFormat
+from mobile_use.utils.ui_hierarchy import (
+    UIHierarchyIndex,
+    get_element_center,
+    get_element_marks,
+    strip_volatile_keys,
+)
+
+screen_api = get_screen_api_client(
+    settings.DEVICE_SCREEN_API_BASE_URL, device_id=settings.DEVICE_SCREEN_API_DEVICE_ID
+)
 device_hardware_api = get_device_hardware_client(settings.DEVICE_HARDWARE_BRIDGE_BASE_URL)
 logger = get_logger(__name__)
 
 
+###### Device calls ######
+
+# Controller operations are generators yielding the device calls they need and receiving their
+# results: the commands of this module run them over blocking clients, the ones of
+# async_mobile_command_controller over async clients, with the same logic.
+
+InputAction = Callable[[], None]
+
+
+class ScreenApiCall(NamedTuple):
+    """GET request to the screen API, answered with its response."""
+
+    path: str
+    params: Mapping[str, int | str]
+    retry_count: Optional[int] = None
+    timeout: Optional[float] = None
+
+    def get_request_kwargs(self) -> dict:
+        kwargs: dict = {"params": self.params, "retry_count": self.retry_count}
+        # left out otherwise: the clients keep their default timeout
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        return kwargs
+
+
+class RunCommandCall(NamedTuple):
+    """Flow submitted to the Device Hardware Bridge, answered with its response."""
+
+    payload: dict
+
+
+class InputActionCall(NamedTuple):
+    """Blocking direct input action (see input_backend), answered with None."""
+
+    input_action: InputAction
+
+
+DeviceCall = Union[ScreenApiCall, RunCommandCall, InputActionCall]
+OperationResult = TypeVar("OperationResult")
+Operation = Generator[DeviceCall, Any, OperationResult]
+
+
+def run_operation(operation: Operation[OperationResult]) -> OperationResult:
+    """Performs the device calls of an operation, its errors raised back into it."""
+    try:
+        call = next(operation)
+        while True:
+            try:
+                result = perform_device_call(call)
+            except Exception as e:
+                call = operation.throw(e)
+            else:
+                call = operation.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def perform_device_call(call: DeviceCall):
+    if isinstance(call, ScreenApiCall):
+        return screen_api.get(call.path, **call.get_request_kwargs())
+    if isinstance(call, RunCommandCall):
+        return device_hardware_api.post("run-command", json=call.payload)
+    return call.input_action()
+
+
 ###### Screen elements retrieval ######
 
 
 class ScreenDataResponse(BaseModel):
-    base64: str
+    base64: Optional[str] = None
     elements: list
     width: int
     height: int
     platform: str
+    seq: int = 0
+    timestamp: Optional[float] = None
+    # shared by the copies of a cached frame (see parse_screen_data), which index it once
+    _ui_hierarchy_index: dict[str, UIHierarchyIndex] = PrivateAttr(default_factory=dict)
+
+    def get_ui_hierarchy_index(self) -> UIHierarchyIndex:
+        """Index of the frame elements, built on first use and kept with the frame."""
+        if "index" not in self._ui_hierarchy_index:
+            self._ui_hierarchy_index["index"] = UIHierarchyIndex(self.elements)
+        return self._ui_hierarchy_index["index"]
+
+
+# Screen probes made around every action are tried once, with a short timeout: their callers
+# carry on without them rather than waiting on an unavailable screen API
+SCREEN_PROBE_TIMEOUT_SECONDS = 1
+
+# Latest parsed frames by ETag, so that a frame fetched again is neither parsed nor indexed twice
+SCREEN_DATA_CACHE_SIZE = 4
+_parsed_screen_data: OrderedDict[str, ScreenDataResponse] = OrderedDict()
+_parsed_screen_data_lock = threading.Lock()
+
+
+def get_screen_data(
+    after_seq: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+    include_screenshot: bool = True,
+) -> ScreenDataResponse:
+    """
+    Get the latest screen data.
+    If `after_seq` is given, waits for the first frame captured after that sequence number
+    (up to `timeout_ms`), falling back to the latest frame on timeout.
+    Skipping the screenshot spares the screen API from downloading and encoding it.
+    """
+    return run_operation(get_screen_data_operation(after_seq, timeout_ms, include_screenshot))
+
+
+def get_screen_data_operation(
+    after_seq: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+    include_screenshot: bool = True,
+) -> Operation[ScreenDataResponse]:
+    params: dict[str, int | str] = {}
+    if not include_screenshot:
+        params["screenshot"] = "false"
+    if after_seq is not None:
+        params["after"] = after_seq
+        if timeout_ms is not None:
+            params["timeout"] = timeout_ms
+    response = yield ScreenApiCall("/screen-info", params)
+    return parse_screen_data(response.content, response.headers)
+
+
+def parse_screen_data(content: bytes, headers: Mapping[str, str]) -> ScreenDataResponse:
+    """
+    Element ids are dropped: the ETag (hence 304 responses and this cache) ignores them, so a
+    body reused for a newer frame would carry ids of an older one.
+    """
+    etag = headers.get("ETag")
+    with _parsed_screen_data_lock:
+        cached = _parsed_screen_data.get(etag) if etag else None
+        if cached is not None:
+            _parsed_screen_data.move_to_end(etag)  # type: ignore
+    if cached is not None:
+        # shallow copy: the elements and their index are shared, seq and timestamp are not
+        screen_data = cached.model_copy()
+    else:
+        screen_data = ScreenDataResponse(**orjson.loads(content))
+        screen_data.elements = strip_volatile_keys(screen_data.elements)
+        if etag:
+            with _parsed_screen_data_lock:
+                _parsed_screen_data[etag] = screen_data.model_copy()
+                if len(_parsed_screen_data) > SCREEN_DATA_CACHE_SIZE:
+                    _parsed_screen_data.popitem(last=False)
+    # the body may come from a revalidated (304) response: headers describe the latest frame
+    if "X-Frame-Seq" in headers:
+        screen_data.seq = int(headers["X-Frame-Seq"])
+        screen_data.timestamp = float(headers["X-Frame-Timestamp"])
+    return screen_data
+
+
+def get_latest_screen_seq() -> int:
+    """Sequence number of the latest frame received by the screen API."""
+    return run_operation(get_latest_screen_seq_operation())
+
+
+def get_latest_screen_seq_operation() -> Operation[int]:
+    response = yield ScreenApiCall(
+        "/status", {}, retry_count=1, timeout=SCREEN_PROBE_TIMEOUT_SECONDS
+    )
+    return int(orjson.loads(response.content)["latest_seq"])
+
+
+def wait_for_screen_to_settle(
+    after_seq: Optional[int] = None,
+    window_ms: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+) -> bool:
+    """
+    Wait until the screen stops changing after frame `after_seq` (the latest frame when the
+    request reaches the screen API by default): returns once it has shown the same content for
+    `window_ms`, when no new frame came within SCREEN_SETTLE_GRACE_MS, or after `timeout_ms` at
+    most.
+    Returns whether the screen was found stable.
+    """
+    return run_operation(wait_for_screen_to_settle_operation(after_seq, window_ms, timeout_ms))
+
+
+def wait_for_screen_to_settle_operation(
+    after_seq: Optional[int] = None,
+    window_ms: Optional[int] = None,
+    timeout_ms: Optional[int] = None,
+) -> Operation[bool]:
+    params = {
+        "window": window_ms if window_ms is not None else settings.SCREEN_SETTLE_WINDOW_MS,
+        "timeout": timeout_ms if timeout_ms is not None else settings.SCREEN_SETTLE_TIMEOUT_MS,
+        "grace": settings.SCREEN_SETTLE_GRACE_MS,
+    }
+    if after_seq is not None:
+        params["after"] = after_seq
+    response = yield ScreenApiCall(
+        "/screen-info/stable",
+        params,
+        retry_count=1,
+        timeout=params["timeout"] / 1000 + SCREEN_PROBE_TIMEOUT_SECONDS,
+    )
+    result = orjson.loads(response.content)
+    logger.info(
+        f"Screen {'settled' if result['stable'] else 'still moving'} after {result['waited_ms']} ms"
+    )
+    return result["stable"]
+
+
+def get_screen_diff(since_seq: int, seq: Optional[int] = None) -> dict:
+    """
+    Get the UI hierarchy changes between frame `since_seq` and frame `seq` (defaults to the
+    latest frame), computed by the screen API from its frame history.
+    Useful to check whether an action changed anything without fetching the whole hierarchy.
+    Tried once: a frame no longer in the history raises ScreenApiError with status 404.
+    """
+    return run_operation(get_screen_diff_operation(since_seq, seq))
 
 
-def get_screen_data():
-    response = screen_api.get("/screen-info")
-    return ScreenDataResponse(**response.json())
+def get_screen_diff_operation(since_seq: int, seq: Optional[int] = None) -> Operation[dict]:
+    params: dict[str, int | str] = {"since": since_seq}
+    if seq is not None:
+        params["seq"] = seq
+    response = yield ScreenApiCall(
+        "/screen-info/diff", params, retry_count=1, timeout=SCREEN_PROBE_TIMEOUT_SECONDS
+    )
+    return orjson.loads(response.content)
 
 
-def take_screenshot():
-    return get_screen_data().base64
+def take_screenshot(
+    image_format: ImageFormat = "png", quality: int = 80, max_size: Optional[int] = None
+) -> bytes:
+    """
+    Get the latest screenshot as raw image bytes, encoded by the screen API.
+    `quality` applies to jpeg/webp, `max_size` bounds the largest dimension in pixels.
+    """
+    return run_operation(take_screenshot_operation(image_format, quality, max_size))
+
+
+def take_screenshot_operation(
+    image_format: ImageFormat = "png", quality: int = 80, max_size: Optional[int] = None
+) -> Operation[bytes]:
+    params: dict[str, int | str] = {"format": image_format, "quality": quality}
+    if max_size is not None:
+        params["max_size"] = max_size
+    response = yield ScreenApiCall("/screenshot", params)
+    return response.content
 
 
 class RunFlowRequest(BaseModel):
@@ -47,28 +311,108 @@ class RunFlowRequest(BaseModel):
 def run_flow(flow_steps: list, dry_run: bool = False) -> Optional[dict]:
     """
     Run a flow i.e, a sequence of commands.
-    Returns None on success, or the response body of the failed command.
+    Returns None on success, or the response body of the failed command along with its index
+    in the flow (`failed_step_index`, None when it cannot be told, see get_failed_step_index).
+
+    With DEVICE_HARDWARE_BRIDGE_BATCH_FLOWS, the whole flow is submitted to the bridge in a
+    single request instead of one request per step.
     """
+    return run_operation(run_flow_operation(flow_steps, dry_run))
+
+
+def run_flow_operation(flow_steps: list, dry_run: bool = False) -> Operation[Optional[dict]]:
     logger.info(f"Running flow: {flow_steps}")
 
-    for step in flow_steps:
-        step_yml = yaml.dump(step)
-        payload = RunFlowRequest(yaml=step_yml, dryRun=dry_run).model_dump(by_alias=True)
-        response = device_hardware_api.post("run-command", json=payload)
+    for first_step_index, flow_yaml in get_flow_commands(flow_steps):
+        payload = RunFlowRequest(yaml=flow_yaml, dryRun=dry_run).model_dump(by_alias=True)
+        response = yield RunCommandCall(payload)
+        failure = get_run_command_failure(response)
+        if failure is not None:
+            return get_flow_failure(failure, flow_steps, first_step_index)
 
-        try:
-            response_body = response.json()
-        except JSONDecodeError:
-            response_body = response.text
+    logger.success("Tool call completed")
+    return None
 
-        if isinstance(response_body, dict):
-            response_body = {k: v for k, v in response_body.items() if v is not None}
 
-        if response.status_code >= 300:
-            logger.error(f"Tool call failed with status code: {response.status_code}")
-            return {"status_code": response.status_code, "body": response_body}
+# Label given to the steps of a batched flow, for the failed one to be told from Maestro's output
+FLOW_STEP_LABEL = "mobile-use step {index}"
+_FLOW_STEP_LABEL_PATTERN = re.compile(r"mobile-use step (\d+)")
 
-    logger.success("Tool call completed")
+
+def get_flow_commands(flow_steps: list) -> list[tuple[Optional[int], str]]:
+    """
+    YAML payloads to submit to the bridge for a flow, with the index of the step each one runs:
+    a single payload for the whole flow in batch mode (index None), one per step otherwise.
+    """
+    if settings.DEVICE_HARDWARE_BRIDGE_BATCH_FLOWS and len(flow_steps) > 1:
+        steps = [get_labeled_flow_step(step, index) for index, step in enumerate(flow_steps)]
+        return [(None, yaml.dump(steps))]
+    return [(index, yaml.dump(step)) for index, step in enumerate(flow_steps)]
+
+
+def get_labeled_flow_step(step, index: int):
+    """Adds a FLOW_STEP_LABEL to commands given as a mapping (e.g. tapOn: {id: ...})."""
+    if not isinstance(step, dict) or len(step) != 1:
+        return step
+    command, arguments = next(iter(step.items()))
+    if not isinstance(arguments, dict) or "label" in arguments:
+        return step
+    return {command: {**arguments, "label": FLOW_STEP_LABEL.format(index=index)}}
+
+
+def get_failed_step_index(failure: dict, flow_steps: list) -> Optional[int]:
+    """
+    Index of the step of a batched flow that failed, found in the bridge response: either the
+    step label, or the only step whose arguments (ids, texts...) the error mentions.
+    """
+    output = json.dumps(failure.get("body"), ensure_ascii=False, default=str)
+    match = _FLOW_STEP_LABEL_PATTERN.search(output)
+    if match is not None and int(match.group(1)) < len(flow_steps):
+        return int(match.group(1))
+    mentioned = [
+        index
+        for index, step in enumerate(flow_steps)
+        if any(value in output for value in iter_flow_step_strings(step))
+    ]
+    return mentioned[0] if len(mentioned) == 1 else None
+
+
+def iter_flow_step_strings(step) -> Iterator[str]:
+    """String arguments of a flow step, command names aside."""
+    if isinstance(step, dict):
+        for value in step.values():
+            yield from iter_flow_step_strings(value)
+    elif isinstance(step, list):
+        for value in step:
+            yield from iter_flow_step_strings(value)
+    elif isinstance(step, str) and len(step) > 1:
+        yield step
+
+
+def get_flow_failure(failure: dict, flow_steps: list, step_index: Optional[int]) -> dict:
+    if step_index is None:
+        step_index = get_failed_step_index(failure, flow_steps)
+    failure["failed_step_index"] = step_index
+    if step_index is None:
+        logger.error(f"Flow of {len(flow_steps)} steps failed")
+    else:
+        logger.error(f"Flow failed at step {step_index}: {flow_steps[step_index]}")
+    return failure
+
+
+def get_run_command_failure(response: requests.Response | httpx.Response) -> Optional[dict]:
+    """Returns None if the command succeeded, its status code and response body otherwise."""
+    try:
+        response_body = response.json()
+    except ValueError:
+        response_body = response.text
+
+    if isinstance(response_body, dict):
+        response_body = {k: v for k, v in response_body.items() if v is not None}
+
+    if response.status_code >= 300:
+        logger.error(f"Tool call failed with status code: {response.status_code}")
+        return {"status_code": response.status_code, "body": response_body}
     return None
 
 
@@ -147,34 +491,135 @@ SelectorRequest = Union[
 ]
 
 
+def get_selector_flow(
+    command: str, selector_request: SelectorRequest, index: Optional[int] = None
+) -> list:
+    """Flow running a single command on a selector, e.g. tapOn."""
+    command_body = selector_request.to_dict()
+    if not command_body:
+        error = f"Invalid {command} selector request, could not format yaml"
+        logger.error(error)
+        raise ControllerErrors(error)
+    if index:
+        command_body["index"] = index
+    return [{command: command_body}]
+
+
+def get_element_ref_selector(
+    ui_hierarchy: list, element_ref: int
+) -> Optional[SelectorRequestWithCoordinates]:
+    """
+    Coordinates selector of the center of the element marked `element_ref` in the UI hierarchy
+    (see get_element_marks), None if there is no such element.
+    """
+    element = get_element_marks(ui_hierarchy).get(element_ref)
+    center = get_element_center(element) if element is not None else None
+    if center is None:
+        return None
+    return SelectorRequestWithCoordinates(
+        coordinates=CoordinatesSelectorRequest(x=center[0], y=center[1])
+    )
+
+
+def resolve_selector_locally(
+    selector_request: SelectorRequest,
+    index: Optional[int],
+    screen_data: ScreenDataResponse,
+) -> Optional[SelectorRequestWithCoordinates]:
+    """
+    Resolve an id and/or text selector to the coordinates of the matching element in the given
+    frame, sparing Maestro from fetching the hierarchy again and retrying its lookup.
+    Returns None when Maestro should resolve it instead: other selector types, a frame older
+    than LOCAL_SELECTOR_MAX_FRAME_AGE_MS, no match, or several matches and no index.
+    """
+    resource_id, text = None, None
+    if isinstance(selector_request, IdWithTextSelectorRequest):
+        resource_id, text = selector_request.id, selector_request.text
+    elif isinstance(selector_request, IdSelectorRequest):
+        resource_id = selector_request.id
+    elif isinstance(selector_request, TextSelectorRequest):
+        text = selector_request.text
+    else:
+        return None
+
+    if screen_data.timestamp is None:
+        return None
+    frame_age_ms = (time.time() - screen_data.timestamp) * 1000
+    if frame_age_ms > settings.LOCAL_SELECTOR_MAX_FRAME_AGE_MS:
+        logger.info(f"Latest frame is {frame_age_ms:.0f} ms old, resolving with Maestro")
+        return None
+
+    matches = screen_data.get_ui_hierarchy_index().find_all_by_selector(
+        resource_id=resource_id, text=text
+    )
+    if (index is None and len(matches) != 1) or (index or 0) >= len(matches):
+        logger.info(f"{len(matches)} elements match {selector_request}, resolving with Maestro")
+        return None
+    center = get_element_center(matches[index or 0])
+    if center is None:
+        return None
+    logger.info(f"Resolved {selector_request} to {center} from frame {screen_data.seq}")
+    return SelectorRequestWithCoordinates(
+        coordinates=CoordinatesSelectorRequest(x=center[0], y=center[1])
+    )
+
+
+def resolve_selector_operation(
+    selector_request: SelectorRequest, index: Optional[int]
+) -> Operation[tuple[SelectorRequest, Optional[int]]]:
+    """
+    With LOCAL_SELECTOR_RESOLUTION, resolves the selector from the latest frame when possible
+    (see resolve_selector_locally). Returns the selector and index to send to Maestro.
+    """
+    if not settings.LOCAL_SELECTOR_RESOLUTION:
+        return selector_request, index
+    try:
+        screen_data = yield from get_screen_data_operation(include_screenshot=False)
+    except Exception as e:
+        logger.warning(f"Could not get the latest frame to resolve {selector_request}: {e}")
+        return selector_request, index
+    resolved = resolve_selector_locally(selector_request, index, screen_data)
+    return (resolved, None) if resolved is not None else (selector_request, index)
+
+
 def tap(selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None):
     """
     Tap on a selector.
     Index is optional and is used when you have multiple views matching the same selector.
     """
-    tap_body = selector_request.to_dict()
-    if not tap_body:
-        error = "Invalid tap selector request, could not format yaml"
-        logger.error(error)
-        raise ControllerErrors(error)
-    if index:
-        tap_body["index"] = index
-    flow_input = [{"tapOn": tap_body}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return run_operation(tap_operation(selector_request, dry_run, index))
+
+
+def tap_operation(
+    selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None
+) -> Operation[Optional[dict]]:
+    selector_request, index = yield from resolve_selector_operation(selector_request, index)
+    flow_input = get_selector_flow("tapOn", selector_request, index)
+    input_action = get_point_input_action("tap", selector_request)
+    return (
+        yield from run_flow_with_wait_for_animation_to_end_operation(
+            flow_input, dry_run=dry_run, input_action=input_action
+        )
+    )
 
 
 def long_press_on(
     selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None
 ):
-    long_press_on_body = selector_request.to_dict()
-    if not long_press_on_body:
-        error = "Invalid longPressOn selector request, could not format yaml"
-        logger.error(error)
-        raise ControllerErrors(error)
-    if index:
-        long_press_on_body["index"] = index
-    flow_input = [{"longPressOn": long_press_on_body}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return run_operation(long_press_on_operation(selector_request, dry_run, index))
+
+
+def long_press_on_operation(
+    selector_request: SelectorRequest, dry_run: bool = False, index: Optional[int] = None
+) -> Operation[Optional[dict]]:
+    selector_request, index = yield from resolve_selector_operation(selector_request, index)
+    flow_input = get_selector_flow("longPressOn", selector_request, index)
+    input_action = get_point_input_action("long_press", selector_request)
+    return (
+        yield from run_flow_with_wait_for_animation_to_end_operation(
+            flow_input, dry_run=dry_run, input_action=input_action
+        )
+    )
 
 
 class SwipeStartEndCoordinatesRequest(BaseModel):
@@ -217,35 +662,58 @@ class SwipeRequest(BaseModel):
         return res
 
 
-def swipe(swipe_request: SwipeRequest, dry_run: bool = False):
+def get_swipe_flow(swipe_request: SwipeRequest) -> list:
     swipe_body = swipe_request.to_dict()
     if not swipe_body:
         error = "Invalid swipe selector request, could not format yaml"
         logger.error(error)
         raise ControllerErrors(error)
-    flow_input = [{"swipe": swipe_body}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return [{"swipe": swipe_body}]
+
+
+def swipe(swipe_request: SwipeRequest, dry_run: bool = False):
+    return run_operation(swipe_operation(swipe_request, dry_run))
+
+
+def swipe_operation(
+    swipe_request: SwipeRequest, dry_run: bool = False
+) -> Operation[Optional[dict]]:
+    return run_flow_with_wait_for_animation_to_end_operation(
+        get_swipe_flow(swipe_request),
+        dry_run=dry_run,
+        input_action=get_swipe_input_action(swipe_request),
+    )
 
 
 ##### Text related commands #####
 
 
 def input_text(text: str, dry_run: bool = False):
-    return run_flow([{"inputText": text}], dry_run=dry_run)
+    return run_operation(input_text_operation(text, dry_run))
+
+
+def input_text_operation(text: str, dry_run: bool = False) -> Operation[Optional[dict]]:
+    return run_input_action_or_flow_operation(
+        [{"inputText": text}], input_action=get_input_text_action(text), dry_run=dry_run
+    )
 
 
 def copy_text_from(selector_request: SelectorRequest, dry_run: bool = False):
-    copy_text_from_body = selector_request.to_dict()
-    if not copy_text_from_body:
-        error = "Invalid copyTextFrom selector request, could not format yaml"
-        logger.error(error)
-        raise ControllerErrors(error)
-    flow_input = [{"copyTextFrom": copy_text_from_body}]
-    return run_flow(flow_input, dry_run=dry_run)
+    return run_operation(copy_text_from_operation(selector_request, dry_run))
+
+
+def copy_text_from_operation(
+    selector_request: SelectorRequest, dry_run: bool = False
+) -> Operation[Optional[dict]]:
+    return run_flow_operation(get_selector_flow("copyTextFrom", selector_request), dry_run=dry_run)
 
 
 def paste_text(dry_run: bool = False):
-    return run_flow(["pasteText"], dry_run=dry_run)
+    return run_operation(paste_text_operation(dry_run))
+
+
+def paste_text_operation(dry_run: bool = False) -> Operation[Optional[dict]]:
+    return run_flow_operation(["pasteText"], dry_run=dry_run)
 
 
 def erase_text(nb_chars: Optional[int] = None, dry_run: bool = False):
@@ -253,38 +721,64 @@ def erase_text(nb_chars: Optional[int] = None, dry_run: bool = False):
     Removes characters from the currently selected textfield (if any)
     Removes 50 characters if nb_chars is not specified.
     """
-    if nb_chars is None:
-        return run_flow(["eraseText"], dry_run=dry_run)
-    return run_flow([{"eraseText": nb_chars}], dry_run=dry_run)
+    return run_operation(erase_text_operation(nb_chars, dry_run))
+
+
+def erase_text_operation(
+    nb_chars: Optional[int] = None, dry_run: bool = False
+) -> Operation[Optional[dict]]:
+    flow_input = ["eraseText"] if nb_chars is None else [{"eraseText": nb_chars}]
+    return run_flow_operation(flow_input, dry_run=dry_run)
 
 
 ##### App related commands #####
 
 
 def launch_app(package_name: str, dry_run: bool = False):
+    return run_operation(launch_app_operation(package_name, dry_run))
+
+
+def launch_app_operation(package_name: str, dry_run: bool = False) -> Operation[Optional[dict]]:
     flow_input = [{"launchApp": package_name}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return run_flow_with_wait_for_animation_to_end_operation(flow_input, dry_run=dry_run)
 
 
 def stop_app(package_name: Optional[str] = None, dry_run: bool = False):
+    return run_operation(stop_app_operation(package_name, dry_run))
+
+
+def stop_app_operation(
+    package_name: Optional[str] = None, dry_run: bool = False
+) -> Operation[Optional[dict]]:
     if package_name is None:
         flow_input = ["stopApp"]
     else:
         flow_input = [{"stopApp": package_name}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return run_flow_with_wait_for_animation_to_end_operation(flow_input, dry_run=dry_run)
 
 
 def open_link(url: str, dry_run: bool = False):
+    return run_operation(open_link_operation(url, dry_run))
+
+
+def open_link_operation(url: str, dry_run: bool = False) -> Operation[Optional[dict]]:
     flow_input = [{"openLink": url}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    return run_flow_with_wait_for_animation_to_end_operation(flow_input, dry_run=dry_run)
 
 
 ##### Key related commands #####
 
 
 def back(dry_run: bool = False):
+    return run_operation(back_operation(dry_run))
+
+
+def back_operation(dry_run: bool = False) -> Operation[Optional[dict]]:
     flow_input = ["back"]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    input_action = get_keycode_input_action("back", KEYCODE_BACK)
+    return run_flow_with_wait_for_animation_to_end_operation(
+        flow_input, dry_run=dry_run, input_action=input_action
+    )
 
 
 class Key(Enum):
@@ -293,9 +787,112 @@ class Key(Enum):
     BACK = "Back"
 
 
+KEY_CODES: dict[Key, int] = {
+    Key.ENTER: KEYCODE_ENTER,
+    Key.HOME: KEYCODE_HOME,
+    Key.BACK: KEYCODE_BACK,
+}
+
+
 def press_key(key: Key, dry_run: bool = False):
+    return run_operation(press_key_operation(key, dry_run))
+
+
+def press_key_operation(key: Key, dry_run: bool = False) -> Operation[Optional[dict]]:
     flow_input = [{"pressKey": key.value}]
-    return run_flow_with_wait_for_animation_to_end(flow_input, dry_run=dry_run)
+    input_action = get_keycode_input_action("press_key", KEY_CODES[key])
+    return run_flow_with_wait_for_animation_to_end_operation(
+        flow_input, dry_run=dry_run, input_action=input_action
+    )
+
+
+##### Direct input #####
+
+
+def get_point(
+    selector_request: SelectorRequest | CoordinatesSelectorRequest | PercentagesSelectorRequest,
+) -> Optional[tuple[int, int]]:
+    """Screen point targeted by a coordinates or percentages selector, None for other ones."""
+    if isinstance(selector_request, SelectorRequestWithCoordinates):
+        selector_request = selector_request.coordinates
+    elif isinstance(selector_request, SelectorRequestWithPercentages):
+        selector_request = selector_request.percentages
+    if isinstance(selector_request, CoordinatesSelectorRequest):
+        return selector_request.x, selector_request.y
+    if isinstance(selector_request, PercentagesSelectorRequest):
+        context = device_context.get()
+        if context is None:
+            return None
+        return (
+            context.device_width * selector_request.x_percent // 100,
+            context.device_height * selector_request.y_percent // 100,
+        )
+    return None
+
+
+def get_point_input_action(
+    action_type: Literal["tap", "long_press"], selector_request: SelectorRequest
+) -> Optional[InputAction]:
+    backend = get_input_backend(action_type)
+    point = get_point(selector_request)
+    if backend is None or point is None:
+        return None
+    return partial(backend.tap if action_type == "tap" else backend.long_press, *point)
+
+
+def get_swipe_input_action(swipe_request: SwipeRequest) -> Optional[InputAction]:
+    backend = get_input_backend("swipe")
+    swipe_mode = swipe_request.swipe_mode
+    if backend is None or isinstance(swipe_mode, str):
+        # directional swipes keep Maestro's gesture
+        return None
+    start, end = get_point(swipe_mode.start), get_point(swipe_mode.end)
+    if start is None or end is None:
+        return None
+    duration_ms = swipe_request.duration or DEFAULT_SWIPE_DURATION_MS
+    return partial(backend.swipe, start, end, duration_ms)
+
+
+def get_keycode_input_action(
+    action_type: Literal["press_key", "back"], keycode: int
+) -> Optional[InputAction]:
+    backend = get_input_backend(action_type)
+    if backend is None:
+        return None
+    return partial(backend.press_keycode, keycode)
+
+
+def get_input_text_action(text: str) -> Optional[InputAction]:
+    backend = get_input_backend("input_text")
+    if backend is None or not backend.supports_text(text):
+        return None
+    return partial(backend.input_text, text)
+
+
+def run_input_action_or_flow(
+    flow_input: list, input_action: Optional[InputAction], dry_run: bool = False
+) -> Optional[dict]:
+    """
+    Performs the action with the direct input backend if any, with the flow on failure.
+    An action that may already have run (see AdbShellOutputError) fails instead of running again.
+    """
+    return run_operation(run_input_action_or_flow_operation(flow_input, input_action, dry_run))
+
+
+def run_input_action_or_flow_operation(
+    flow_input: list, input_action: Optional[InputAction], dry_run: bool = False
+) -> Operation[Optional[dict]]:
+    if input_action is not None and not dry_run:
+        try:
+            yield InputActionCall(input_action)
+            logger.success(f"Direct input completed: {flow_input}")
+            return None
+        except AdbShellOutputError as e:
+            logger.error(f"Direct input outcome unknown, not running it again: {e}")
+            return {"error": str(e)}
+        except Exception as e:
+            logger.warning(f"Direct input failed, falling back to Maestro: {e}")
+    return (yield from run_flow_operation(flow_input, dry_run=dry_run))
 
 
 #### Other commands ####
@@ -307,15 +904,50 @@ class WaitTimeout(Enum):
     LONG = 5000
 
 
-def wait_for_animation_to_end(timeout: Optional[WaitTimeout] = None, dry_run: bool = False):
+def get_wait_for_animation_to_end_flow(timeout: Optional[WaitTimeout] = None) -> list:
     if timeout is None:
-        return run_flow(["waitForAnimationToEnd"], dry_run=dry_run)
-    return run_flow([{"waitForAnimationToEnd": {"timeout": timeout.value}}], dry_run=dry_run)
+        return ["waitForAnimationToEnd"]
+    return [{"waitForAnimationToEnd": {"timeout": timeout.value}}]
+
+
+def wait_for_animation_to_end(timeout: Optional[WaitTimeout] = None, dry_run: bool = False):
+    return run_operation(wait_for_animation_to_end_operation(timeout, dry_run))
 
 
-def run_flow_with_wait_for_animation_to_end(base_flow: list, dry_run: bool = False):
-    base_flow.append({"waitForAnimationToEnd": {"timeout": WaitTimeout.MEDIUM.value}})
-    return run_flow(base_flow, dry_run=dry_run)
+def wait_for_animation_to_end_operation(
+    timeout: Optional[WaitTimeout] = None, dry_run: bool = False
+) -> Operation[Optional[dict]]:
+    return run_flow_operation(get_wait_for_animation_to_end_flow(timeout), dry_run=dry_run)
+
+
+def run_flow_with_wait_for_animation_to_end(
+    base_flow: list, dry_run: bool = False, input_action: Optional[InputAction] = None
+):
+    """
+    Run a flow (or its direct `input_action`, see run_input_action_or_flow), then wait for the
+    screen to settle.
+    The screen API watches the frames following the action, from the latest one once the action
+    has returned, and answers as soon as the screen is stable. The action succeeded either way:
+    if the screen API cannot tell, the error is only logged.
+    """
+    return run_operation(
+        run_flow_with_wait_for_animation_to_end_operation(base_flow, dry_run, input_action)
+    )
+
+
+def run_flow_with_wait_for_animation_to_end_operation(
+    base_flow: list, dry_run: bool = False, input_action: Optional[InputAction] = None
+) -> Operation[Optional[dict]]:
+    output = yield from run_input_action_or_flow_operation(
+        base_flow, input_action=input_action, dry_run=dry_run
+    )
+    if output is not None or dry_run:
+        return output
+    try:
+        yield from wait_for_screen_to_settle_operation()
+    except Exception as e:
+        logger.error(f"Could not wait for the screen to settle: {e}")
+    return None
 
 
 if __name__ == "__main__":
@@ -334,6 +966,7 @@ if __name__ == "__main__":
         latest_screenshot_base64=screen_data.base64,
         focused_app_info=None,
         device_date="",
+        latest_screen_seq=screen_data.seq,
         structured_decisions=None,
         executor_retrigger=False,
         executor_failed=False,
@@ -344,13 +977,15 @@ if __name__ == "__main__":
 
     # invoke erase_text tool
     input_resource_id = "com.google.android.settings.intelligence:id/open_search_view_edit_text"
-    command_output: Command = erase_text_tool.invoke(
-        {
-            "tool_call_id": uuid.uuid4().hex,
-            "agent_thought": "",
-            "input_text_resource_id": input_resource_id,
-            "state": dummy_state,
-            "executor_metadata": None,
-        }
+    command_output: Command = asyncio.run(
+        erase_text_tool.ainvoke(
+            {
+                "tool_call_id": uuid.uuid4().hex,
+                "agent_thought": "",
+                "input_text_resource_id": input_resource_id,
+                "state": dummy_state,
+                "executor_metadata": None,
+            }
+        )
     )
     print(command_output)
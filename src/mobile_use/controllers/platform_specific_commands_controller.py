@@ -1,27 +1,36 @@
-from datetime import date
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
-from adbutils import AdbDevice
+from adbutils import AdbError
 from mobile_use.clients.adb_client import adb
+from mobile_use.clients.adb_shell_pool import get_shell_pool
+from mobile_use.config import settings
 from mobile_use.context import get_device_context
+from mobile_use.utils.logger import get_logger
 from mobile_use.utils.shell_utils import run_shell_command_on_host
 
+logger = get_logger(__name__)
 
-def get_adb_device() -> AdbDevice:
-    """Get the first available device."""
-    devices = adb.device_list()
-    if not devices:
-        raise ConnectionError("No device found.")
-    return devices[0]
+DEVICE_DATE_FORMAT = "%a %b %d %H:%M:%S %Z %Y"
+# Beyond this, a cached device clock offset is considered off and measured again
+DEVICE_CLOCK_MAX_DRIFT_SECONDS = 1
+
+
+def run_adb_shell(command: str) -> str:
+    """Runs a shell command on the device of the current context, over a pooled shell session."""
+    return get_shell_pool(get_device_context().device_id).run(command)
 
 
 def get_first_device_id() -> str:
     """Gets the first available device."""
-    android_output = run_shell_command_on_host("adb devices")
-    lines = android_output.strip().split("\n")
-    for line in lines:
-        if "device" in line and not line.startswith("List of devices"):
-            return line.split()[0]
+    try:
+        android_devices = adb.device_list()
+    except AdbError:
+        android_devices = []
+    if android_devices:
+        return android_devices[0].serial
     ios_output = run_shell_command_on_host("xcrun simctl list devices booted")
     return ios_output
 
@@ -30,9 +39,7 @@ def get_focused_app_info() -> Optional[str]:
     context = get_device_context()
     if context.mobile_platform == "IOS":
         return None
-    device = get_adb_device()
-    result: str = device.shell("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'")  # type: ignore
-    return result
+    return run_adb_shell("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'")
 
 
 def get_screen_size() -> tuple[int, int]:
@@ -40,13 +47,96 @@ def get_screen_size() -> tuple[int, int]:
     return context.device_width, context.device_height
 
 
+class DeviceClock:
+    """
+    Offset and timezone of a device clock relative to the host clock, measured with a single
+    `date` call, so that the device time can be derived locally.
+    """
+
+    def __init__(self, offset_seconds: float, tz: timezone, synced_at: float):
+        self.offset_seconds = offset_seconds
+        self.tz = tz
+        self.synced_at = synced_at
+        self.synced_at_monotonic = time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(time.time() + self.offset_seconds, tz=self.tz)
+
+    def get_host_clock_drift(self) -> float:
+        """How far the host wall clock moved from the monotonic clock since the sync (e.g. NTP)."""
+        elapsed = time.monotonic() - self.synced_at_monotonic
+        return time.time() - self.synced_at - elapsed
+
+    def needs_resync(self) -> bool:
+        elapsed = time.monotonic() - self.synced_at_monotonic
+        return (
+            elapsed >= settings.DEVICE_CLOCK_RESYNC_SECONDS
+            or abs(self.get_host_clock_drift()) > DEVICE_CLOCK_MAX_DRIFT_SECONDS
+        )
+
+
+_device_clocks: dict[str, DeviceClock] = {}
+# one lock per device: a sync waits for the one in progress on its device only
+_device_clock_locks: dict[str, threading.Lock] = {}
+_device_clock_locks_lock = threading.Lock()
+
+
+def parse_device_clock(date_output: str, host_time: float) -> DeviceClock:
+    """Parses the output of `date '+%s %z %Z'`, e.g. `1718000000 +0200 CEST`."""
+    epoch, utc_offset, *tz_name = date_output.split()
+    sign = -1 if utc_offset.startswith("-") else 1
+    hours, minutes = int(utc_offset[1:3]), int(utc_offset[3:5])
+    tz = timezone(
+        sign * timedelta(hours=hours, minutes=minutes), name=tz_name[0] if tz_name else utc_offset
+    )
+    # `%s` is truncated to the second: the device time is, on average, half a second later
+    return DeviceClock(offset_seconds=int(epoch) + 0.5 - host_time, tz=tz, synced_at=time.time())
+
+
+def sync_device_clock(device_id: str) -> DeviceClock:
+    """Measures the device clock and replaces the cached one."""
+    started_at = time.time()
+    output = run_adb_shell("date '+%s %z %Z'")
+    # the device clock was read somewhere during the round trip
+    clock = parse_device_clock(output, host_time=(started_at + time.time()) / 2)
+    previous = _device_clocks.get(device_id)
+    if previous is not None:
+        drift = clock.offset_seconds - previous.offset_seconds
+        if abs(drift) > DEVICE_CLOCK_MAX_DRIFT_SECONDS or clock.tz != previous.tz:
+            logger.info(f"Device clock drifted by {drift:.1f}s ({clock.tz}), offset replaced")
+    _device_clocks[device_id] = clock
+    return clock
+
+
+def get_device_clock(device_id: str) -> DeviceClock:
+    """
+    Cached clock of the device. It is measured again every DEVICE_CLOCK_RESYNC_SECONDS, and as
+    soon as the host wall clock jumps, which shifts the cached offset by as much.
+    """
+    with _device_clock_locks_lock:
+        device_lock = _device_clock_locks.setdefault(device_id, threading.Lock())
+    with device_lock:
+        clock = _device_clocks.get(device_id)
+        if clock is None or clock.needs_resync():
+            clock = sync_device_clock(device_id)
+        return clock
+
+
+def format_device_date(moment: datetime) -> str:
+    """Formats the date as the Android `date` does, with a space-padded day (e.g. `Jun  5`)."""
+    return moment.strftime(f"%a %b {moment.day:>2} %H:%M:%S %Z %Y")
+
+
 def get_device_date() -> str:
     context = get_device_context()
     if context.mobile_platform == "IOS":
-        return date.today().strftime("%a %b %d %H:%M:%S %Z %Y")
-    device = get_adb_device()
-    result: str = device.shell("date")  # type: ignore
-    return result
+        return date.today().strftime(DEVICE_DATE_FORMAT)
+    try:
+        clock = get_device_clock(context.device_id)
+    except (ValueError, IndexError) as e:
+        logger.warning(f"Could not sync the device clock, reading the device date instead: {e}")
+        return run_adb_shell("date")
+    return format_device_date(clock.now())
 
 
 def list_packages() -> str:
@@ -55,6 +145,5 @@ def list_packages() -> str:
         cmd = ["xcrun", "simctl", "listapps", "booted", "|", "grep", "CFBundleIdentifier"]
         return run_shell_command_on_host(" ".join(cmd))
     else:
-        device = get_adb_device()
         cmd = ["pm", "list", "packages", "-f"]
-        return device.shell(" ".join(cmd))  # type: ignore
+        return run_adb_shell(" ".join(cmd))
@@ -0,0 +1,70 @@
+import httpx
+import yaml
+from mobile_use.clients.adb_shell_pool import AdbShellOutputError
+from mobile_use.controllers import input_backend, mobile_command_controller
+from mobile_use.controllers.input_backend import AdbInputBackend
+
+
+class RecordingShellPool:
+    def __init__(self):
+        self.commands: list[str] = []
+
+    def run(self, command: str) -> str:
+        self.commands.append(command)
+        return ""
+
+
+def get_backend(monkeypatch) -> AdbInputBackend:
+    monkeypatch.setattr(input_backend, "get_shell_pool", lambda serial: RecordingShellPool())
+    return AdbInputBackend(serial="emulator-5554")
+
+
+def test_text_is_typed_with_encoded_spaces(monkeypatch):
+    backend = get_backend(monkeypatch)
+
+    backend.input_text("it's a test")
+
+    assert backend.shell_pool.commands == ["input text 'it'\"'\"'s%sa%stest'"]
+
+
+def test_text_input_can_type_neither_unicode_nor_a_literal_percent_s(monkeypatch):
+    backend = get_backend(monkeypatch)
+
+    assert backend.supports_text("100% sure")
+    assert not backend.supports_text("café")
+    assert not backend.supports_text("line\nbreak")
+    assert not backend.supports_text("printf %s")
+
+
+def get_bridge_steps(monkeypatch) -> list:
+    """Steps the bridge is asked to run."""
+    steps = []
+
+    def post(path: str, json: dict) -> httpx.Response:
+        steps.append(yaml.safe_load(json["yaml"]))
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(mobile_command_controller.device_hardware_api, "post", post)
+    return steps
+
+
+def test_failed_input_falls_back_to_the_flow(monkeypatch):
+    steps = get_bridge_steps(monkeypatch)
+
+    def fail():
+        raise OSError("device offline")
+
+    assert mobile_command_controller.run_input_action_or_flow(["back"], fail) is None
+    assert steps == ["back"]
+
+
+def test_input_whose_outcome_is_unknown_is_not_run_again(monkeypatch):
+    steps = get_bridge_steps(monkeypatch)
+
+    def fail():
+        raise AdbShellOutputError("No output for `input keyevent 4`")
+
+    result = mobile_command_controller.run_input_action_or_flow(["back"], fail)
+
+    assert result == {"error": "No output for `input keyevent 4`"}
+    assert steps == []
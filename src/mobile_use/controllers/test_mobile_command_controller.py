@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import httpx
+import orjson
+import yaml
+from mobile_use.clients.screen_api_client import ScreenApiError
+from mobile_use.controllers import async_mobile_command_controller as async_controller
+from mobile_use.controllers import mobile_command_controller as controller
+
+
+def test_action_is_not_run_again_when_the_screen_cannot_settle(monkeypatch):
+    payloads = []
+
+    def post(path: str, json: dict) -> httpx.Response:
+        payloads.append(json)
+        return httpx.Response(200, json={})
+
+    def get(path: str, **kwargs):
+        raise ScreenApiError("Screen API unavailable", status_code=503)
+
+    monkeypatch.setattr(controller.device_hardware_api, "post", post)
+    monkeypatch.setattr(controller.screen_api, "get", get)
+    flow = [{"launchApp": "com.example.app"}]
+
+    assert controller.run_flow_with_wait_for_animation_to_end(flow) is None
+    assert [yaml.safe_load(payload["yaml"]) for payload in payloads] == [
+        {"launchApp": "com.example.app"}
+    ]
+    assert flow == [{"launchApp": "com.example.app"}]
+
+
+def get_screen_body() -> bytes:
+    elements = [
+        {"resourceId": "app:id/title", "text": "Sign in", "bounds": "[0,0][1080,200]", "id": "1"},
+        {"resourceId": "app:id/login", "text": "Sign in", "bounds": "[0,600][1080,700]"},
+    ]
+    return orjson.dumps(
+        {"elements": elements, "width": 1080, "height": 2400, "platform": "ANDROID"}
+    )
+
+
+def test_frame_fetched_again_is_neither_parsed_nor_indexed_twice():
+    body = get_screen_body()
+    headers = {"ETag": 'W/"frame"', "X-Frame-Seq": "3", "X-Frame-Timestamp": str(time.time())}
+
+    first = controller.parse_screen_data(body, headers)
+    second = controller.parse_screen_data(b"", {**headers, "X-Frame-Seq": "4"})
+
+    assert (first.seq, second.seq) == (3, 4)
+    assert "id" not in second.elements[0]
+    assert second.get_ui_hierarchy_index() is first.get_ui_hierarchy_index()
+
+
+def test_selector_is_resolved_from_a_recent_frame_only_when_it_is_unambiguous():
+    screen_data = controller.ScreenDataResponse(
+        **orjson.loads(get_screen_body()), timestamp=time.time()
+    )
+
+    login = controller.IdSelectorRequest(id="login")
+
+    resolved = controller.resolve_selector_locally(login, None, screen_data)
+    assert resolved is not None and resolved.to_dict() == {"point": "540, 650"}
+    ambiguous = controller.TextSelectorRequest(text="Sign in")
+    assert controller.resolve_selector_locally(ambiguous, None, screen_data) is None
+    assert controller.resolve_selector_locally(ambiguous, 1, screen_data) is not None
+
+    screen_data.timestamp = time.time() - 60
+    assert controller.resolve_selector_locally(login, None, screen_data) is None
+
+
+def test_batched_flow_is_sent_at_once_and_tells_its_failed_step(monkeypatch):
+    payloads = []
+
+    def post(path: str, json: dict) -> httpx.Response:
+        payloads.append(json)
+        return httpx.Response(400, json={"message": 'Element not found: label "mobile-use step 1"'})
+
+    monkeypatch.setattr(controller.settings, "DEVICE_HARDWARE_BRIDGE_BATCH_FLOWS", True)
+    monkeypatch.setattr(controller.device_hardware_api, "post", post)
+    flow = [{"tapOn": {"id": "app:id/email"}}, {"tapOn": {"text": "Sign in"}}, "back"]
+
+    failure = controller.run_flow(flow)
+
+    assert len(payloads) == 1
+    assert yaml.safe_load(payloads[0]["yaml"]) == [
+        {"tapOn": {"id": "app:id/email", "label": "mobile-use step 0"}},
+        {"tapOn": {"text": "Sign in", "label": "mobile-use step 1"}},
+        "back",
+    ]
+    assert failure is not None and failure["failed_step_index"] == 1
+
+
+def test_failed_step_is_told_from_the_arguments_the_error_mentions():
+    flow = [{"inputText": "john@example.com"}, {"tapOn": "Sign in"}, "back"]
+
+    mentioned = {"body": {"message": "Element not found: Text matching regex: Sign in"}}
+    assert controller.get_failed_step_index(mentioned, flow) == 1
+    assert controller.get_failed_step_index({"body": "Command failed"}, flow) is None
+
+
+def test_async_commands_run_the_same_operations_over_async_clients(monkeypatch):
+    paths, steps = [], []
+
+    async def get(path: str, **kwargs) -> httpx.Response:
+        paths.append(path)
+        if path == "/screen-info/stable":
+            return httpx.Response(200, json={"stable": True, "waited_ms": 120})
+        headers = {"X-Frame-Seq": "3", "X-Frame-Timestamp": str(time.time())}
+        return httpx.Response(200, content=get_screen_body(), headers=headers)
+
+    async def post(path: str, json: dict) -> httpx.Response:
+        steps.append(yaml.safe_load(json["yaml"]))
+        return httpx.Response(200, json={})
+
+    monkeypatch.setattr(controller.settings, "LOCAL_SELECTOR_RESOLUTION", True)
+    monkeypatch.setattr(async_controller.screen_api, "get", get)
+    monkeypatch.setattr(async_controller.device_hardware_api, "post", post)
+
+    result = asyncio.run(async_controller.tap(controller.IdSelectorRequest(id="login")))
+
+    assert result is None
+    assert paths == ["/screen-info", "/screen-info/stable"]
+    assert steps == [{"tapOn": {"point": "540, 650"}}]
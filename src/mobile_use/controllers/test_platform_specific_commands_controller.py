@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from mobile_use.controllers import platform_specific_commands_controller as controller
+
+
+def test_device_date_matches_the_android_date_output():
+    clock = controller.parse_device_clock("1717596192 +0200 CEST", host_time=1717596192.5)
+
+    device_time = datetime.fromtimestamp(1717596192, tz=clock.tz)
+    assert controller.format_device_date(device_time) == "Wed Jun  5 16:03:12 CEST 2024"
+    assert clock.offset_seconds == 0
+
+
+def test_device_clock_is_measured_again_when_the_host_clock_jumps(monkeypatch):
+    date_calls = []
+
+    def run_adb_shell(command: str) -> str:
+        date_calls.append(command)
+        return "1717596192 +0200 CEST"
+
+    monkeypatch.setattr(controller, "run_adb_shell", run_adb_shell)
+    monkeypatch.setattr(controller, "_device_clocks", {})
+
+    clock = controller.get_device_clock("emulator-5554")
+    assert controller.get_device_clock("emulator-5554") is clock
+    assert len(date_calls) == 1
+
+    # as if NTP moved the host clock back by 5 seconds right after the sync
+    clock.synced_at += 5
+    assert controller.get_device_clock("emulator-5554") is not clock
+    assert len(date_calls) == 2
@@ -21,6 +21,7 @@ from mobile_use.agents.planner.utils import (
 from mobile_use.agents.summarizer.summarizer import summarizer_node
 from mobile_use.graph.state import State
 from mobile_use.tools.index import EXECUTOR_WRAPPERS_TOOLS, get_tools_from_wrappers
+from mobile_use.utils.conversations import is_fast_nonui_tool, is_tool_message
 from mobile_use.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -85,6 +86,19 @@ def post_executor_tools_gate(
     return "done"
 
 
+def post_summarizer_gate(
+    state: State,
+) -> Literal["refresh_context", "reuse_context"]:
+    logger.info("Starting post_summarizer_gate")
+    if state.latest_ui_hierarchy is None or state.latest_screen_seq is None:
+        return "refresh_context"
+    tool_messages = [msg for msg in state.executor_messages if is_tool_message(msg)]
+    if tool_messages and all(is_fast_nonui_tool(msg) for msg in tool_messages):
+        logger.info("Only non-UI tools ran since the latest context, reusing it")
+        return "reuse_context"
+    return "refresh_context"
+
+
 async def get_graph() -> CompiledStateGraph:
     graph_builder = StateGraph(State)
 
@@ -139,6 +153,10 @@ async def get_graph() -> CompiledStateGraph:
         },
     )
     graph_builder.add_edge("executor_context_cleaner", "summarizer")
-    graph_builder.add_edge("summarizer", "contextor")
+    graph_builder.add_conditional_edges(
+        "summarizer",
+        post_summarizer_gate,
+        {"refresh_context": "contextor", "reuse_context": "cortex"},
+    )
 
     return graph_builder.compile()
@@ -41,6 +41,9 @@ class State(AgentStatePydantic):
     ]
     focused_app_info: Annotated[Optional[str], "Focused app info", take_last]
     device_date: Annotated[Optional[str], "Date of the device", take_last]
+    latest_screen_seq: Annotated[
+        Optional[int], "Sequence number of the screen frame of the latest context", take_last
+    ]
 
     # cortex related keys
     structured_decisions: Annotated[
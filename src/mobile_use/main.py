@@ -71,6 +71,8 @@ def check_device_screen_api_health_with_retry_logic(
 
     base_url = base_url or f"http://localhost:{server_settings.DEVICE_SCREEN_API_PORT}"
     health_url = f"{base_url}/health"
+    if settings.DEVICE_SCREEN_API_DEVICE_ID:
+        health_url = f"{base_url}/devices/{settings.DEVICE_SCREEN_API_DEVICE_ID}/health"
     consecutive_failures = 0
 
     restart_screen_api = not settings.DEVICE_SCREEN_API_BASE_URL
@@ -221,7 +223,7 @@ async def run_automation(
     set_llm_config_context(LLMConfigContext(llm_config=llm_config))
     logger.info(str(llm_config))
 
-    screen_data: ScreenDataResponse = get_screen_data()
+    screen_data: ScreenDataResponse = get_screen_data(include_screenshot=False)
 
     device_context_instance = DeviceContext(
         host_platform="WINDOWS" if host_platform == "Windows" else "LINUX",
@@ -260,6 +262,7 @@ async def run_automation(
         latest_screenshot_base64=None,
         focused_app_info=None,
         device_date=None,
+        latest_screen_seq=None,
         structured_decisions=None,
         agents_thoughts=[],
         remaining_steps=RECURSION_LIMIT,
@@ -10,6 +10,11 @@ logger = get_logger(__name__)
 class ServerSettings(BaseSettings):
     DEVICE_HARDWARE_BRIDGE_BASE_URL: str = f"http://localhost:{DEVICE_HARDWARE_BRIDGE_PORT}"
     DEVICE_SCREEN_API_PORT: int = 9998
+    # Download screenshots only when a client asks for one, instead of for every frame
+    DEVICE_SCREEN_API_LAZY_SCREENSHOTS: bool = False
+    # Recent frames kept per device, bounded both in count and in bytes
+    DEVICE_SCREEN_API_HISTORY_SIZE: int = 30
+    DEVICE_SCREEN_API_HISTORY_MAX_BYTES: int = 50_000_000
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
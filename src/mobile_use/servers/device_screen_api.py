@@ -1,138 +1,343 @@
-import base64
-import json
-import threading
 import time
 from contextlib import asynccontextmanager
+from typing import Optional
 
-import requests
+import httpx
 import uvicorn
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from mobile_use.servers.config import server_settings
+from mobile_use.servers.device_screen_stream import (
+    DeviceScreenStream,
+    ScreenFrame,
+    close_http_client,
+)
 from mobile_use.servers.utils import is_port_in_use
-from sseclient import SSEClient
-
-DEVICE_HARDWARE_BRIDGE_BASE_URL = server_settings.DEVICE_HARDWARE_BRIDGE_BASE_URL
-DEVICE_HARDWARE_BRIDGE_API_URL = f"{DEVICE_HARDWARE_BRIDGE_BASE_URL}/api"
-
-_latest_screen_data = None
-_data_lock = threading.Lock()
-_stream_thread = None
-_stop_event = threading.Event()
-
-
-def _stream_worker():
-    global _latest_screen_data
-    sse_url = f"{DEVICE_HARDWARE_BRIDGE_API_URL}/device-screen/sse"
-    headers = {"Accept": "text/event-stream"}
-
-    while not _stop_event.is_set():
-        try:
-            with requests.get(sse_url, stream=True, headers=headers) as response:
-                response.raise_for_status()
-                print("--- Stream connected, listening for events... ---")
-                event_source = (chunk for chunk in response.iter_content())
-                client = SSEClient(event_source)
-                for event in client.events():
-                    if _stop_event.is_set():
-                        break
-                    if event.event == "message" and event.data:
-                        data = json.loads(event.data)
-                        screenshot_path = data.get("screenshot")
-                        elements = data.get("elements", [])
-                        width = data.get("width")
-                        height = data.get("height")
-                        platform = data.get("platform")
-
-                        image_url = f"{DEVICE_HARDWARE_BRIDGE_BASE_URL}{screenshot_path}"
-                        image_response = requests.get(image_url)
-                        image_response.raise_for_status()
-                        base64_image = base64.b64encode(image_response.content).decode("utf-8")
-                        base64_data_url = f"data:image/png;base64,{base64_image}"
-
-                        with _data_lock:
-                            _latest_screen_data = {
-                                "base64": base64_data_url,
-                                "elements": elements,
-                                "width": width,
-                                "height": height,
-                                "platform": platform,
-                            }
-
-        except requests.exceptions.RequestException as e:
-            print(f"Connection error in stream worker: {e}. Retrying in 2 seconds...")
-            with _data_lock:
-                _latest_screen_data = None
-            time.sleep(2)
-
-
-def start_stream():
-    global _stream_thread
-    if _stream_thread is None or not _stream_thread.is_alive():
-        _stop_event.clear()
-        _stream_thread = threading.Thread(target=_stream_worker, daemon=True)
-        _stream_thread.start()
-        print("--- Background screen streaming started ---")
-
-
-def stop_stream():
-    global _stream_thread
-    if _stream_thread and _stream_thread.is_alive():
-        _stop_event.set()
-        _stream_thread.join(timeout=2)
-        print("--- Background screen streaming stopped ---")
+from mobile_use.utils.media import ImageFormat
+from mobile_use.utils.ui_hierarchy import UIHierarchyDiff, diff_ui_hierarchies
+from pydantic import BaseModel
+
+# Device served by the un-prefixed routes (/screen-info, /screenshot, /health)
+DEFAULT_DEVICE_ID = "default"
+
+MAX_WAIT_SECONDS = 30
+DEFAULT_NEXT_FRAME_TIMEOUT_SECONDS = 5
+DEFAULT_STABLE_WINDOW_MS = 300
+DEFAULT_STABLE_TIMEOUT_MS = 2000
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESSED_BODY_BYTES = 1024
+SCREENSHOT_MEDIA_TYPES: dict[str, str] = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+_streams: dict[str, DeviceScreenStream] = {}
+
+
+def add_device_stream(device_id: str, bridge_base_url: str) -> DeviceScreenStream:
+    stream = _streams.get(device_id)
+    if stream is not None and stream.bridge_base_url == bridge_base_url.rstrip("/"):
+        return stream
+    if stream is not None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Device {device_id} is already registered with {stream.bridge_base_url}",
+        )
+    stream = DeviceScreenStream(device_id=device_id, bridge_base_url=bridge_base_url)
+    _streams[device_id] = stream
+    stream.start()
+    return stream
+
+
+async def remove_device_stream(device_id: str):
+    stream = _streams.pop(device_id, None)
+    if stream is not None:
+        await stream.stop()
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    start_stream()
+    add_device_stream(DEFAULT_DEVICE_ID, server_settings.DEVICE_HARDWARE_BRIDGE_BASE_URL)
     yield
-    stop_stream()
+    for device_id in list(_streams):
+        await remove_device_stream(device_id)
+    await close_http_client()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
-def get_latest_data():
-    """Helper to get the latest data safely, with retries."""
-    max_wait_time = 30  # seconds
-    retry_delay = 2  # seconds
-    start_time = time.time()
+def get_device_stream(device_id: str = DEFAULT_DEVICE_ID) -> DeviceScreenStream:
+    stream = _streams.get(device_id)
+    if stream is None:
+        raise HTTPException(status_code=404, detail=f"Unknown device: {device_id}")
+    return stream
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Weak comparison of the request If-None-Match header against the given ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def negotiate_content_encoding(request: Request) -> str:
+    """`gzip` if the Accept-Encoding header accepts it, `identity` otherwise."""
+    accepted = set()
+    for value in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = value.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+async def get_latest_data(
+    stream: DeviceScreenStream,
+    after_seq: int = 0,
+    timeout_seconds: float = MAX_WAIT_SECONDS,
+) -> ScreenFrame:
+    """
+    Helper to get the latest data safely.
+    Waits until a frame newer than `after_seq` is available or the timeout expires, then returns
+    the latest frame (which may be older than requested on timeout).
+    """
+    frame = await stream.wait_for_frame(after_seq=after_seq, timeout_seconds=timeout_seconds)
+    if frame is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Screen data is not yet available after multiple retries.",
+        )
+    return frame
+
 
-    while time.time() - start_time < max_wait_time:
-        with _data_lock:
-            if _latest_screen_data is not None:
-                return _latest_screen_data
-        time.sleep(retry_delay)
+def get_history_frame(stream: DeviceScreenStream, seq: int) -> ScreenFrame:
+    frame = stream.get_frame(seq)
+    if frame is None:
+        raise HTTPException(status_code=404, detail=f"Frame {seq} is not in the history anymore")
+    return frame
+
+
+# Routes served both for the default device and under /devices/{device_id}
+screen_router = APIRouter()
+
+
+@screen_router.get("/screen-info")
+async def get_screen_info(
+    request: Request,
+    after: Optional[int] = None,
+    timeout: Optional[int] = None,
+    screenshot: bool = True,
+    seq: Optional[int] = None,
+    stream: DeviceScreenStream = Depends(get_device_stream),
+):
+    """
+    Returns the latest screen frame.
+    When `after` is given, waits (up to `timeout` ms) for the first frame whose sequence number
+    is greater than `after`. On timeout, the latest frame is returned: compare its `seq`.
+    When `seq` is given, returns that frame from the history instead.
+    Set `screenshot=false` to skip the screenshot (`base64` is then null).
+    Responds 304 when the content matches the `If-None-Match` ETag.
+    """
+    if seq is not None:
+        frame = get_history_frame(stream, seq)
+    elif after is None:
+        frame = await get_latest_data(stream)
+    else:
+        timeout_seconds = DEFAULT_NEXT_FRAME_TIMEOUT_SECONDS if timeout is None else timeout / 1000
+        frame = await get_latest_data(
+            stream,
+            after_seq=after,
+            timeout_seconds=min(max(timeout_seconds, 0), MAX_WAIT_SECONDS),
+        )
+    try:
+        etag = await frame.get_etag(include_screenshot=screenshot)
+        headers = {**frame.get_headers(), "ETag": etag}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        content_encoding = negotiate_content_encoding(request)
+        body = await frame.get_body(include_screenshot=screenshot, content_encoding="identity")
+        if content_encoding != "identity" and len(body) >= MIN_COMPRESSED_BODY_BYTES:
+            body = await frame.get_body(
+                include_screenshot=screenshot, content_encoding=content_encoding
+            )
+            headers["Content-Encoding"] = content_encoding
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Screenshot not available: {e}")
+    headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    raise HTTPException(
-        status_code=503,
-        detail="Screen data is not yet available after multiple retries.",
+
+@screen_router.get("/screen-info/diff")
+async def get_screen_info_diff(
+    since: int,
+    seq: Optional[int] = None,
+    stream: DeviceScreenStream = Depends(get_device_stream),
+):
+    """
+    Returns the UI hierarchy changes between frame `since` and frame `seq` (the latest frame
+    by default): added, removed and changed nodes, keyed by a stable node identity.
+    Both frames must still be in the history.
+    """
+    since_frame = get_history_frame(stream, since)
+    frame = get_history_frame(stream, seq) if seq is not None else await get_latest_data(stream)
+    if await since_frame.get_hierarchy_fingerprint() == await frame.get_hierarchy_fingerprint():
+        diff = UIHierarchyDiff()
+    else:
+        diff = await run_in_threadpool(diff_ui_hierarchies, since_frame.elements, frame.elements)
+    return JSONResponse(
+        content={
+            "since": since_frame.seq,
+            "seq": frame.seq,
+            "has_changes": diff.has_changes,
+            **diff.model_dump(),
+        },
+        headers=frame.get_headers(),
     )
 
 
-@app.get("/screen-info")
-async def get_screen_info():
-    data = get_latest_data()
-    return JSONResponse(content=data)
+@screen_router.get("/screen-info/stable")
+async def wait_for_stable_screen(
+    after: Optional[int] = None,
+    window: int = Query(default=DEFAULT_STABLE_WINDOW_MS, ge=0),
+    timeout: int = Query(default=DEFAULT_STABLE_TIMEOUT_MS, ge=0),
+    grace: Optional[int] = Query(default=None, ge=0),
+    stream: DeviceScreenStream = Depends(get_device_stream),
+):
+    """
+    Waits for the screen to settle after frame `after`, the latest frame at request time by
+    default, i.e. once the action to wait for has returned: returns once frames newer than
+    `after` have shown the same screen (same hierarchy, similar screenshot) for `window` ms, or
+    after `timeout` ms at most.
+    With `grace`, returns early (as stable) when no frame newer than `after` comes within
+    `grace` ms, meaning the screen no longer changes.
+    """
+    started_at = time.perf_counter()
+    frame, stable = await stream.wait_for_stable_frame(
+        after_seq=after if after is not None else stream.latest_seq,
+        window_seconds=window / 1000,
+        timeout_seconds=min(timeout / 1000, MAX_WAIT_SECONDS),
+        grace_seconds=grace / 1000 if grace is not None else None,
+    )
+    if frame is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Screen data is not yet available after multiple retries.",
+        )
+    return JSONResponse(
+        content={
+            "seq": frame.seq,
+            "stable": stable,
+            "waited_ms": round((time.perf_counter() - started_at) * 1000),
+        },
+        headers=frame.get_headers(),
+    )
 
 
-@app.get("/health")
-async def health_check():
-    """Check if the Maestro Studio server is healthy."""
-    health_url = f"{DEVICE_HARDWARE_BRIDGE_API_URL}/banner-message"
+@screen_router.get("/screenshot")
+async def get_screenshot(
+    request: Request,
+    format: ImageFormat = "png",
+    quality: int = Query(default=80, ge=1, le=100),
+    max_size: Optional[int] = Query(default=None, ge=1),
+    seq: Optional[int] = None,
+    stream: DeviceScreenStream = Depends(get_device_stream),
+):
+    """
+    Returns the latest screenshot (or the one of frame `seq`, from the history) as image bytes.
+    `quality` applies to jpeg/webp, `max_size` bounds the largest dimension in pixels.
+    """
+    frame = get_history_frame(stream, seq) if seq is not None else await get_latest_data(stream)
     try:
-        response = requests.get(health_url, timeout=5)
-        response.raise_for_status()
-        with _data_lock:
-            if _latest_screen_data is None:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Screen data is not yet available after multiple retries.",
-                )
-        return JSONResponse(content=response.json())
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=503, detail=f"Maestro Studio not available: {e}")
+        etag = f'W/"{await frame.get_screenshot_hash()}-{format}-{quality}-{max_size}"'
+        headers = {**frame.get_headers(), "ETag": etag}
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        content = await frame.get_screenshot_variant(format, quality, max_size)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Screenshot not available: {e}")
+    return Response(content=content, media_type=SCREENSHOT_MEDIA_TYPES[format], headers=headers)
+
+
+@screen_router.get("/frames")
+async def list_frames(
+    from_seq: Optional[int] = None,
+    to_seq: Optional[int] = None,
+    stream: DeviceScreenStream = Depends(get_device_stream),
+):
+    """
+    Lists the frames kept in the history within the given sequence range (inclusive).
+    Their content is served by /screen-info?seq=<seq> and /screenshot?seq=<seq>.
+    """
+    frames = stream.get_frames(from_seq=from_seq, to_seq=to_seq)
+    return JSONResponse(content=[frame.get_summary() for frame in frames])
+
+
+@screen_router.get("/status")
+async def get_status(stream: DeviceScreenStream = Depends(get_device_stream)):
+    """Stream state of the device, including the sequence number of its latest frame."""
+    return JSONResponse(content=stream.get_status())
+
+
+@screen_router.get("/health")
+async def health_check(stream: DeviceScreenStream = Depends(get_device_stream)):
+    """
+    Check if the Maestro Studio server is healthy.
+    Answered from the last background probe of the bridge, without calling it.
+    """
+    if stream.bridge_health_error is not None:
+        raise HTTPException(
+            status_code=503, detail=f"Maestro Studio not available: {stream.bridge_health_error}"
+        )
+    if stream.latest_frame is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Screen data is not yet available after multiple retries.",
+        )
+    return JSONResponse(content=stream.bridge_health)
+
+
+class AddDeviceRequest(BaseModel):
+    device_id: str
+    bridge_base_url: str
+
+
+@app.get("/devices")
+async def list_devices():
+    return JSONResponse(content=[stream.get_status() for stream in _streams.values()])
+
+
+@app.post("/devices")
+async def add_device(request: AddDeviceRequest):
+    """Registers a Device Hardware Bridge and starts streaming its screen."""
+    stream = add_device_stream(request.device_id, request.bridge_base_url)
+    return JSONResponse(content=stream.get_status())
+
+
+@app.delete("/devices/{device_id}")
+async def remove_device(device_id: str):
+    get_device_stream(device_id)
+    await remove_device_stream(device_id)
+    return Response(status_code=204)
+
+
+app.include_router(screen_router)
+app.include_router(screen_router, prefix="/devices/{device_id}")
 
 
 def start():
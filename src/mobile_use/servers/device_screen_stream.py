@@ -0,0 +1,518 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from mobile_use.servers.config import server_settings
+from mobile_use.servers.sse import SSEDecoder
+from mobile_use.utils.media import ImageFormat, encode_image, get_image_dhash
+from mobile_use.utils.ui_hierarchy import get_ui_hierarchy_fingerprint
+
+STREAM_CONNECT_TIMEOUT_SECONDS = 10
+STREAM_RECONNECT_MIN_DELAY_SECONDS = 0.5
+STREAM_RECONNECT_MAX_DELAY_SECONDS = 10
+HEALTH_PROBE_INTERVAL_SECONDS = 2
+HEALTH_PROBE_TIMEOUT_SECONDS = 5
+GZIP_COMPRESSION_LEVEL = 5
+# Screenshots of frames moved to the history are re-encoded to save memory
+ARCHIVED_SCREENSHOT_FORMAT: ImageFormat = "jpeg"
+ARCHIVED_SCREENSHOT_QUALITY = 60
+# Superseded frames waiting for the archiver, beyond which frames are kept unarchived
+ARCHIVE_QUEUE_SIZE = 16
+# Screenshots whose perceptual hashes differ by at most this many bits look alike (out of 64)
+STABLE_SCREENSHOT_MAX_DHASH_DISTANCE = 2
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Connection pool shared by every device stream."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=STREAM_CONNECT_TIMEOUT_SECONDS)
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def compress_body(body: bytes, content_encoding: str) -> bytes:
+    if content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_COMPRESSION_LEVEL)
+    return body
+
+
+class ScreenFrame:
+    """
+    A single frame received from the device screen stream.
+    The screenshot is downloaded either eagerly by the stream worker, or lazily on the first
+    request that needs it (see DEVICE_SCREEN_API_LAZY_SCREENSHOTS). The raw image, its base64
+    encoding and every re-encoded variant served by /screenshot are memoized on the frame.
+    Content hashes are memoized as well and exposed as weak ETags, so that clients can revalidate
+    an unchanged screen with a 304 instead of downloading it again.
+    Serialized (and compressed) /screen-info bodies are cached per representation.
+    Once superseded, a frame is archived: its caches are dropped and its screenshot is re-encoded.
+    """
+
+    def __init__(
+        self,
+        seq: int,
+        bridge_base_url: str,
+        screenshot_path: Optional[str],
+        elements: list,
+        width: Optional[int],
+        height: Optional[int],
+        platform: Optional[str],
+        elements_size: int = 0,
+    ):
+        self.seq = seq
+        self.timestamp = time.time()
+        self.bridge_base_url = bridge_base_url
+        self.screenshot_path = screenshot_path
+        self.elements = elements
+        self.width = width
+        self.height = height
+        self.platform = platform
+        # size of the serialized elements, used for the history memory budget
+        self.elements_size = elements_size
+        self.archived = False
+        self._screenshot_bytes: Optional[bytes] = None
+        self._screenshot_format: ImageFormat = "png"
+        self._screenshot_base64: Optional[str] = None
+        self._screenshot_variants: dict[tuple[str, int, Optional[int]], bytes] = {}
+        self._screenshot_hash: Optional[str] = None
+        self._screenshot_dhash: Optional[int] = None
+        self._hierarchy_fingerprint: Optional[str] = None
+        self._bodies: dict[tuple[bool, str], bytes] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_screenshot_bytes(self) -> bytes:
+        async with self._lock:
+            if self._screenshot_bytes is None:
+                image_url = f"{self.bridge_base_url}{self.screenshot_path}"
+                image_response = await get_http_client().get(image_url)
+                image_response.raise_for_status()
+                self._screenshot_bytes = image_response.content
+            return self._screenshot_bytes
+
+    async def get_screenshot_base64(self) -> str:
+        screenshot_bytes = await self.get_screenshot_bytes()
+        async with self._lock:
+            if self._screenshot_base64 is None:
+                base64_image = await run_in_threadpool(base64.b64encode, screenshot_bytes)
+                self._screenshot_base64 = (
+                    f"data:image/{self._screenshot_format};base64,{base64_image.decode('utf-8')}"
+                )
+            return self._screenshot_base64
+
+    async def get_screenshot_variant(
+        self, image_format: ImageFormat, quality: int, max_size: Optional[int]
+    ) -> bytes:
+        screenshot_bytes = await self.get_screenshot_bytes()
+        if image_format == self._screenshot_format and max_size is None:
+            return screenshot_bytes
+        key = (image_format, quality, max_size)
+        async with self._lock:
+            variant = self._screenshot_variants.get(key)
+            if variant is None:
+                variant = await run_in_threadpool(
+                    encode_image,
+                    screenshot_bytes,
+                    image_format=image_format,
+                    quality=quality,
+                    max_size=max_size,
+                )
+                self._screenshot_variants[key] = variant
+            return variant
+
+    async def get_hierarchy_fingerprint(self) -> str:
+        if self._hierarchy_fingerprint is None:
+            self._hierarchy_fingerprint = await run_in_threadpool(
+                get_ui_hierarchy_fingerprint, self.elements
+            )
+        return self._hierarchy_fingerprint
+
+    async def get_screenshot_hash(self) -> str:
+        if self._screenshot_hash is None:
+            screenshot_bytes = await self.get_screenshot_bytes()
+            self._screenshot_hash = hashlib.blake2b(screenshot_bytes, digest_size=16).hexdigest()
+        return self._screenshot_hash
+
+    async def get_screenshot_dhash(self) -> int:
+        """Perceptual hash of the screenshot, used to tell whether the screen is still moving."""
+        if self._screenshot_dhash is None:
+            screenshot_bytes = await self.get_screenshot_bytes()
+            self._screenshot_dhash = await run_in_threadpool(get_image_dhash, screenshot_bytes)
+        return self._screenshot_dhash
+
+    async def looks_like(self, other: "ScreenFrame") -> bool:
+        """
+        Whether both frames show the same screen: same UI hierarchy, and screenshots whose
+        perceptual hashes are close enough. Screenshots are only compared when hierarchies match.
+        """
+        if (self.width, self.height) != (other.width, other.height):
+            return False
+        if await self.get_hierarchy_fingerprint() != await other.get_hierarchy_fingerprint():
+            return False
+        try:
+            dhash = await self.get_screenshot_dhash()
+            other_dhash = await other.get_screenshot_dhash()
+        except (httpx.HTTPError, OSError):
+            # no comparable screenshots, rely on the hierarchy alone
+            return True
+        return (dhash ^ other_dhash).bit_count() <= STABLE_SCREENSHOT_MAX_DHASH_DISTANCE
+
+    async def get_etag(self, include_screenshot: bool = True) -> str:
+        """
+        Validator of the frame content. Like the hierarchy fingerprint it ignores element ids,
+        which change with every frame: a 304 body may carry the ids of an older frame.
+        """
+        tag = f"{await self.get_hierarchy_fingerprint()}-{self.width}x{self.height}"
+        if include_screenshot:
+            tag += f"-{await self.get_screenshot_hash()}"
+        return f'W/"{tag}"'
+
+    def get_headers(self) -> dict[str, str]:
+        """Frame identity, sent on 304 responses too so revalidated clients see the latest frame."""
+        return {"X-Frame-Seq": str(self.seq), "X-Frame-Timestamp": str(self.timestamp)}
+
+    async def to_dict(self, include_screenshot: bool = True) -> dict:
+        return {
+            "base64": await self.get_screenshot_base64() if include_screenshot else None,
+            "elements": self.elements,
+            "width": self.width,
+            "height": self.height,
+            "platform": self.platform,
+            "seq": self.seq,
+            "timestamp": self.timestamp,
+        }
+
+    @property
+    def size_bytes(self) -> int:
+        size = self.elements_size + len(self._screenshot_bytes or b"")
+        size += len(self._screenshot_base64 or "")
+        size += sum(len(variant) for variant in self._screenshot_variants.values())
+        size += sum(len(body) for body in self._bodies.values())
+        return size
+
+    async def archive(self):
+        """
+        Drops every cache of the frame and re-encodes its screenshot (when already downloaded).
+        Screenshot hashes are computed beforehand so that ETags and comparisons stay stable.
+        """
+        if self._screenshot_bytes is not None:
+            await self.get_screenshot_hash()
+            try:
+                await self.get_screenshot_dhash()
+            except Exception as e:
+                print(f"--- Could not hash screenshot of frame {self.seq}: {e!r} ---")
+        async with self._lock:
+            self._screenshot_base64 = None
+            self._screenshot_variants = {}
+            self._bodies = {}
+            if self._screenshot_bytes is not None and not self.archived:
+                try:
+                    self._screenshot_bytes = await run_in_threadpool(
+                        encode_image,
+                        self._screenshot_bytes,
+                        image_format=ARCHIVED_SCREENSHOT_FORMAT,
+                        quality=ARCHIVED_SCREENSHOT_QUALITY,
+                    )
+                    self._screenshot_format = ARCHIVED_SCREENSHOT_FORMAT
+                except Exception as e:
+                    # e.g. a truncated or oversized image: keep the original rather than the frame
+                    print(f"--- Could not re-encode screenshot of frame {self.seq}: {e!r} ---")
+            self.archived = True
+
+    def get_summary(self) -> dict:
+        return {
+            "seq": self.seq,
+            "timestamp": self.timestamp,
+            "width": self.width,
+            "height": self.height,
+            "platform": self.platform,
+            "has_screenshot": self._screenshot_bytes is not None,
+            "size_bytes": self.size_bytes,
+        }
+
+    async def get_body(self, include_screenshot: bool, content_encoding: str) -> bytes:
+        key = (include_screenshot, content_encoding)
+        body = self._bodies.get(key)
+        if body is None:
+            if content_encoding == "identity":
+                data = await self.to_dict(include_screenshot=include_screenshot)
+                body = await run_in_threadpool(orjson.dumps, data)
+            else:
+                identity_body = await self.get_body(include_screenshot, "identity")
+                body = await run_in_threadpool(compress_body, identity_body, content_encoding)
+            self._bodies[key] = body
+        return body
+
+
+class DeviceScreenStream:
+    """
+    Screen stream of a single device, read from its Device Hardware Bridge.
+    Owns the background workers, the latest frame, a bounded history of recent frames
+    and the stream health.
+    Superseded frames are archived by a background worker, off the ingest path.
+    The bridge health is probed periodically in the background, so that health checks are
+    answered from the last probe instead of waiting on the bridge.
+    """
+
+    def __init__(self, device_id: str, bridge_base_url: str):
+        self.device_id = device_id
+        self.bridge_base_url = bridge_base_url.rstrip("/")
+        self.latest_frame: Optional[ScreenFrame] = None
+        self.latest_seq = 0
+        self.connected = False
+        self.last_error: Optional[str] = None
+        self.history: deque[ScreenFrame] = deque()
+        self.bridge_health: Optional[dict] = None
+        self.bridge_health_error: Optional[str] = "Not probed yet"
+        self.bridge_health_checked_at: Optional[float] = None
+        self._condition = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._archive_queue: asyncio.Queue[ScreenFrame] = asyncio.Queue(ARCHIVE_QUEUE_SIZE)
+        self._archive_task: Optional[asyncio.Task] = None
+
+    @property
+    def bridge_api_url(self) -> str:
+        return f"{self.bridge_base_url}/api"
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            print(f"--- [{self.device_id}] Background screen streaming started ---")
+
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._probe_health())
+
+        if self._archive_task is None or self._archive_task.done():
+            self._archive_task = asyncio.create_task(self._archive_frames())
+
+    async def stop(self):
+        for task in (self._health_task, self._archive_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._health_task = None
+        self._archive_task = None
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            print(f"--- [{self.device_id}] Background screen streaming stopped ---")
+        self._task = None
+        self.connected = False
+
+    async def wait_for_frame(self, after_seq: int, timeout_seconds: float) -> Optional[ScreenFrame]:
+        """
+        Waits until a frame newer than `after_seq` is available or the timeout expires, then returns
+        the latest frame (which may be older than requested on timeout), or None.
+        """
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(
+                        lambda: self.latest_frame is not None and self.latest_frame.seq > after_seq
+                    ),
+                    timeout=timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                pass
+            return self.latest_frame
+
+    async def wait_for_stable_frame(
+        self,
+        after_seq: int,
+        window_seconds: float,
+        timeout_seconds: float,
+        grace_seconds: Optional[float] = None,
+    ) -> tuple[Optional[ScreenFrame], bool]:
+        """
+        Waits for the screen to settle after frame `after_seq`: returns as soon as frames newer
+        than `after_seq` have looked alike (see ScreenFrame.looks_like) for `window_seconds`,
+        or when `timeout_seconds` expires.
+        With `grace_seconds`, also returns when no frame newer than `after_seq` comes within that
+        delay: the screen did not change, which counts as stable.
+        Returns the latest frame and whether the screen was found stable.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_seconds
+        first_frame_timeout = (
+            min(grace_seconds, timeout_seconds) if grace_seconds is not None else timeout_seconds
+        )
+        frame = await self.wait_for_frame(after_seq=after_seq, timeout_seconds=first_frame_timeout)
+        if frame is None or frame.seq <= after_seq:
+            return frame, frame is not None and grace_seconds is not None
+
+        stable_since = loop.time()
+        while True:
+            now = loop.time()
+            remaining_window = stable_since + window_seconds - now
+            if remaining_window <= 0:
+                return frame, True
+            if deadline <= now:
+                return frame, False
+            next_frame = await self.wait_for_frame(
+                after_seq=frame.seq, timeout_seconds=min(remaining_window, deadline - now)
+            )
+            if next_frame is None or next_frame.seq <= frame.seq:
+                continue
+            if not await frame.looks_like(next_frame):
+                stable_since = loop.time()
+            frame = next_frame
+
+    def get_frame(self, seq: int) -> Optional[ScreenFrame]:
+        for frame in reversed(self.history):
+            if frame.seq == seq:
+                return frame
+        return None
+
+    def get_frames(self, from_seq: Optional[int], to_seq: Optional[int]) -> list[ScreenFrame]:
+        lower = from_seq if from_seq is not None else 0
+        upper = to_seq if to_seq is not None else self.latest_seq
+        return [frame for frame in self.history if lower <= frame.seq <= upper]
+
+    def get_status(self) -> dict:
+        return {
+            "device_id": self.device_id,
+            "bridge_base_url": self.bridge_base_url,
+            "connected": self.connected,
+            "latest_seq": self.latest_seq,
+            "latest_frame_timestamp": self.latest_frame.timestamp if self.latest_frame else None,
+            "last_error": self.last_error,
+            "bridge_healthy": self.bridge_health_error is None,
+            "bridge_health_checked_at": self.bridge_health_checked_at,
+            "history_size": len(self.history),
+            "history_bytes": sum(frame.size_bytes for frame in self.history),
+        }
+
+    async def _publish_frame(self, frame: Optional[ScreenFrame]):
+        async with self._condition:
+            if frame is not None:
+                self.latest_seq = frame.seq
+            self.latest_frame = frame
+            self._condition.notify_all()
+
+        if frame is not None:
+            if self.history:
+                try:
+                    self._archive_queue.put_nowait(self.history[-1])
+                except asyncio.QueueFull:
+                    # the archiver is behind: the frame stays as is until evicted
+                    pass
+            self.history.append(frame)
+            self._trim_history()
+
+    async def _archive_frames(self):
+        while True:
+            frame = await self._archive_queue.get()
+            try:
+                await frame.archive()
+            except Exception as e:
+                print(f"[{self.device_id}] Could not archive frame {frame.seq}: {e!r}")
+
+    def _trim_history(self):
+        """Evicts the oldest frames beyond the count and byte budgets, keeping the latest one."""
+        max_size = max(server_settings.DEVICE_SCREEN_API_HISTORY_SIZE, 1)
+        max_bytes = server_settings.DEVICE_SCREEN_API_HISTORY_MAX_BYTES
+        total_bytes = sum(frame.size_bytes for frame in self.history)
+        while len(self.history) > 1 and (len(self.history) > max_size or total_bytes > max_bytes):
+            total_bytes -= self.history.popleft().size_bytes
+
+    async def _handle_event(self, data: str):
+        try:
+            payload = json.loads(data)
+        except json.JSONDecodeError as e:
+            print(f"[{self.device_id}] Skipping malformed screen event: {e}")
+            return
+        frame = ScreenFrame(
+            seq=self.latest_seq + 1,
+            bridge_base_url=self.bridge_base_url,
+            screenshot_path=payload.get("screenshot"),
+            elements=payload.get("elements", []),
+            width=payload.get("width"),
+            height=payload.get("height"),
+            platform=payload.get("platform"),
+            elements_size=len(data),
+        )
+        if not server_settings.DEVICE_SCREEN_API_LAZY_SCREENSHOTS:
+            await frame.get_screenshot_bytes()
+        await self._publish_frame(frame)
+
+    async def _probe_health(self):
+        health_url = f"{self.bridge_api_url}/banner-message"
+        while True:
+            try:
+                response = await get_http_client().get(
+                    health_url, timeout=HEALTH_PROBE_TIMEOUT_SECONDS
+                )
+                response.raise_for_status()
+                self.bridge_health = response.json()
+                self.bridge_health_error = None
+            except (httpx.HTTPError, ValueError) as e:
+                self.bridge_health = None
+                self.bridge_health_error = str(e) or type(e).__name__
+            self.bridge_health_checked_at = time.time()
+            await asyncio.sleep(HEALTH_PROBE_INTERVAL_SECONDS)
+
+    async def _run(self):
+        sse_url = f"{self.bridge_api_url}/device-screen/sse"
+        timeout = httpx.Timeout(STREAM_CONNECT_TIMEOUT_SECONDS, read=None)
+        last_event_id: Optional[str] = None
+        reconnect_delay = STREAM_RECONNECT_MIN_DELAY_SECONDS
+
+        while True:
+            headers = {"Accept": "text/event-stream"}
+            if last_event_id:
+                headers["Last-Event-ID"] = last_event_id
+            decoder = SSEDecoder()
+            try:
+                async with get_http_client().stream(
+                    "GET", sse_url, headers=headers, timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    print(f"--- [{self.device_id}] Stream connected, listening for events... ---")
+                    self.connected = True
+                    self.last_error = None
+                    reconnect_delay = STREAM_RECONNECT_MIN_DELAY_SECONDS
+                    async for chunk in response.aiter_bytes():
+                        for event in decoder.feed(chunk):
+                            if event.event == "message" and event.data:
+                                await self._handle_event(event.data)
+                        last_event_id = decoder.last_event_id or last_event_id
+                print(f"--- [{self.device_id}] Stream closed by the server, reconnecting... ---")
+            except httpx.HTTPError as e:
+                print(f"[{self.device_id}] Connection error in stream worker: {e}. Retrying...")
+                self.last_error = str(e)
+                await self._publish_frame(None)
+            except Exception as e:
+                # e.g. a malformed event: never let the worker die, reconnect like on errors
+                print(f"[{self.device_id}] Unexpected error in stream worker: {e!r}. Retrying...")
+                self.last_error = repr(e)
+                await self._publish_frame(None)
+            self.connected = False
+
+            # exponential backoff, never retrying sooner than the server asked for
+            if decoder.retry is not None:
+                reconnect_delay = max(reconnect_delay, decoder.retry / 1000)
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, STREAM_RECONNECT_MAX_DELAY_SECONDS)
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from mobile_use.servers import device_screen_api, device_screen_stream
+from mobile_use.servers.device_screen_stream import DeviceScreenStream, ScreenFrame
+
+
+def get_frame(seq: int, text: str) -> ScreenFrame:
+    frame = ScreenFrame(
+        seq=seq,
+        bridge_base_url="http://bridge",
+        screenshot_path=None,
+        elements=[{"resourceId": "app:id/title", "text": text, "bounds": "[0,0][1080,200]"}],
+        width=1080,
+        height=2400,
+        platform="ANDROID",
+    )
+    # screenshots are never downloaded: frames look alike when their hierarchies match
+    frame._screenshot_dhash = 0
+    return frame
+
+
+def add_frames(stream: DeviceScreenStream, *frames: ScreenFrame):
+    """Publishes frames without a running stream worker."""
+    for frame in frames:
+        stream.history.append(frame)
+        stream.latest_frame = frame
+        stream.latest_seq = frame.seq
+
+
+@pytest.fixture
+def stream(monkeypatch) -> DeviceScreenStream:
+    stream = DeviceScreenStream(device_id="emulator-5554", bridge_base_url="http://bridge")
+    monkeypatch.setitem(device_screen_api._streams, device_screen_api.DEFAULT_DEVICE_ID, stream)
+    return stream
+
+
+@pytest.fixture
+def client() -> TestClient:
+    # not entered as a context manager: the lifespan would connect to a real bridge
+    return TestClient(device_screen_api.app)
+
+
+def test_stable_screen_is_watched_from_the_latest_frame_by_default(stream, client):
+    add_frames(stream, get_frame(1, "Welcome"), get_frame(2, "Signing in..."))
+
+    response = client.get("/screen-info/stable", params={"window": 100, "grace": 50})
+
+    # frame 2 came before the request: nothing newer within the grace delay, stable
+    assert response.json()["seq"] == 2 and response.json()["stable"]
+    assert response.json()["waited_ms"] < 100
+
+
+def test_stability_window_restarts_on_every_change():
+    async def settle() -> tuple[list[int], ScreenFrame, bool]:
+        stream = DeviceScreenStream(device_id="emulator-5554", bridge_base_url="http://bridge")
+        add_frames(stream, get_frame(1, "Welcome"))
+        published = []
+
+        async def animate():
+            for seq, text in enumerate(["Signing", "Signing in", "Signed in", "Signed in"], 2):
+                await asyncio.sleep(0.05)
+                await stream._publish_frame(get_frame(seq, text))
+                published.append(seq)
+
+        animation = asyncio.create_task(animate())
+        frame, stable = await stream.wait_for_stable_frame(
+            after_seq=1, window_seconds=0.12, timeout_seconds=2, grace_seconds=0.5
+        )
+        await animation
+        return published, frame, stable
+
+    published, frame, stable = asyncio.run(settle())
+
+    assert stable and published == [2, 3, 4, 5]
+    assert frame.elements[0]["text"] == "Signed in"
+
+
+def test_unchanged_screen_is_revalidated_with_its_etag(stream, client):
+    add_frames(stream, get_frame(1, "Welcome"))
+    first = client.get("/screen-info", params={"screenshot": False})
+    etag = first.headers["ETag"]
+
+    add_frames(stream, get_frame(2, "Welcome"))
+    unchanged = client.get(
+        "/screen-info", params={"screenshot": False}, headers={"If-None-Match": etag}
+    )
+    add_frames(stream, get_frame(3, "Signed in"))
+    changed = client.get(
+        "/screen-info", params={"screenshot": False}, headers={"If-None-Match": etag}
+    )
+
+    assert first.status_code == 200 and first.json()["seq"] == 1
+    # same content in a newer frame: no body, but the headers tell the latest frame
+    assert unchanged.status_code == 304 and unchanged.headers["X-Frame-Seq"] == "2"
+    assert changed.status_code == 200 and changed.json()["seq"] == 3
+
+
+def test_long_poll_falls_back_to_the_latest_frame_on_timeout(stream, client):
+    add_frames(stream, get_frame(1, "Welcome"))
+
+    started_at = time.perf_counter()
+    response = client.get("/screen-info", params={"after": 1, "timeout": 100, "screenshot": False})
+
+    assert response.json()["seq"] == 1
+    assert time.perf_counter() - started_at >= 0.1
+
+
+def test_long_poll_answers_as_soon_as_a_newer_frame_comes():
+    async def poll() -> tuple[ScreenFrame, float]:
+        stream = DeviceScreenStream(device_id="emulator-5554", bridge_base_url="http://bridge")
+        add_frames(stream, get_frame(1, "Welcome"))
+
+        async def publish():
+            await asyncio.sleep(0.05)
+            await stream._publish_frame(get_frame(2, "Signed in"))
+
+        publishing = asyncio.create_task(publish())
+        started_at = time.perf_counter()
+        frame = await device_screen_api.get_latest_data(stream, after_seq=1, timeout_seconds=5)
+        await publishing
+        return frame, time.perf_counter() - started_at
+
+    frame, waited = asyncio.run(poll())
+
+    assert frame.seq == 2 and waited < 1
+
+
+def test_devices_are_registered_once_and_served_under_their_prefix(monkeypatch, client):
+    monkeypatch.setattr(device_screen_api, "_streams", {})
+    # no background workers: the bridge does not exist
+    monkeypatch.setattr(DeviceScreenStream, "start", lambda self: None)
+    device = {"device_id": "emulator-5556", "bridge_base_url": "http://bridge-2/"}
+
+    assert client.post("/devices", json=device).status_code == 200
+    assert client.post("/devices", json=device).status_code == 200
+    conflict = client.post("/devices", json={**device, "bridge_base_url": "http://bridge-3"})
+    status = client.get("/devices/emulator-5556/status").json()
+    devices = client.get("/devices").json()
+
+    assert conflict.status_code == 409
+    assert status["bridge_base_url"] == "http://bridge-2" and status["latest_seq"] == 0
+    assert [listed["device_id"] for listed in devices] == ["emulator-5556"]
+
+    assert client.delete("/devices/emulator-5556").status_code == 204
+    assert client.get("/devices/emulator-5556/status").status_code == 404
+    assert client.delete("/devices/emulator-5556").status_code == 404
+
+
+def test_history_keeps_the_latest_frames_within_its_byte_budget(monkeypatch, stream, client):
+    monkeypatch.setattr(
+        device_screen_stream.server_settings, "DEVICE_SCREEN_API_HISTORY_MAX_BYTES", 2500
+    )
+
+    async def publish():
+        for seq in range(1, 5):
+            frame = get_frame(seq, f"Step {seq}")
+            frame.elements_size = 1000
+            await stream._publish_frame(frame)
+
+    asyncio.run(publish())
+    frames = client.get("/frames").json()
+    latest_frames = client.get("/frames", params={"from_seq": 4}).json()
+
+    assert [frame["seq"] for frame in frames] == [3, 4]
+    assert [frame["seq"] for frame in latest_frames] == [4]
+    assert client.get("/screen-info", params={"seq": 3, "screenshot": False}).json()["seq"] == 3
+    assert client.get("/screen-info", params={"seq": 1, "screenshot": False}).status_code == 404
+
+
+def test_diff_tells_whether_the_screen_changed_since_a_frame(stream, client):
+    add_frames(stream, get_frame(1, "Welcome"), get_frame(2, "Welcome"), get_frame(3, "Signed in"))
+
+    unchanged = client.get("/screen-info/diff", params={"since": 1, "seq": 2}).json()
+    changed = client.get("/screen-info/diff", params={"since": 1})
+    evicted = client.get("/screen-info/diff", params={"since": 0})
+
+    assert unchanged["seq"] == 2 and not unchanged["has_changes"]
+    assert changed.json()["seq"] == 3 and changed.json()["has_changes"]
+    assert changed.headers["X-Frame-Seq"] == "3"
+    assert evicted.status_code == 404
@@ -0,0 +1,35 @@
+from mobile_use.servers.sse import SSEDecoder
+
+
+def test_decoder_handles_events_split_across_chunks():
+    decoder = SSEDecoder()
+    stream = b'id: 7\nevent: message\ndata: {"a":\ndata:  1}\r\n\r\n: comment\ndata: second\r\r\n'
+
+    events = []
+    for i in range(0, len(stream), 5):
+        events.extend(decoder.feed(stream[i : i + 5]))
+
+    assert [e.data for e in events] == ['{"a":\n 1}', "second"]
+    assert events[0].event == "message"
+    assert events[0].id == "7"
+    assert decoder.last_event_id == "7"
+
+
+def test_decoder_keeps_carriage_return_split_from_line_feed():
+    decoder = SSEDecoder()
+
+    assert decoder.feed(b"data: x\r") == []
+    assert decoder.feed(b"\n") == []
+    events = decoder.feed(b"\r\n")
+
+    assert [e.data for e in events] == ["x"]
+
+
+def test_decoder_ignores_events_without_data_and_reads_retry():
+    decoder = SSEDecoder()
+
+    events = decoder.feed(b"event: ping\n\nretry: 3000\ndata: \xe2\x80\xa8ok\n\n")
+
+    assert len(events) == 1
+    assert events[0].data == "\u2028ok"
+    assert decoder.retry == 3000
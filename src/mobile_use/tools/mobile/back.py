@@ -4,19 +4,19 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import back as back_controller
+from mobile_use.controllers.async_mobile_command_controller import back as back_controller
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def back(
+async def back(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
 ):
     """Navigates to the previous screen. (Only works on Android for the moment)"""
-    output = back_controller()
+    output = await back_controller()
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
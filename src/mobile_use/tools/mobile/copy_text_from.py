@@ -4,17 +4,17 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import SelectorRequest
-from mobile_use.controllers.mobile_command_controller import (
+from mobile_use.controllers.async_mobile_command_controller import (
     copy_text_from as copy_text_from_controller,
 )
+from mobile_use.controllers.mobile_command_controller import SelectorRequest
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from pydantic import Field
 from typing_extensions import Annotated
 
 
 @tool
-def copy_text_from(
+async def copy_text_from(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -35,7 +35,7 @@ def copy_text_from(
 
     See the Selectors documentation for supported selector types.
     """
-    output = copy_text_from_controller(selector_request=selector_request)
+    output = await copy_text_from_controller(selector_request=selector_request)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
@@ -7,22 +7,21 @@ from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 from typing_extensions import Annotated
 
-from mobile_use.controllers.mobile_command_controller import (
-    ScreenDataResponse,
-    WaitTimeout,
-    get_screen_data,
-    wait_for_animation_to_end,
-)
-from mobile_use.controllers.mobile_command_controller import (
+from mobile_use.controllers.async_mobile_command_controller import (
     erase_text as erase_text_controller,
 )
+from mobile_use.controllers.async_mobile_command_controller import (
+    get_latest_screen_seq,
+    get_screen_data,
+)
+from mobile_use.controllers.mobile_command_controller import ScreenDataResponse, WaitTimeout
 from mobile_use.graph.state import State
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from mobile_use.utils.ui_hierarchy import find_element_by_resource_id
 
 
 @tool
-def erase_text(
+async def erase_text(
     tool_call_id: Annotated[str, InjectedToolCallId],
     state: Annotated[State, InjectedState],
     agent_thought: str,
@@ -53,17 +52,23 @@ def erase_text(
         if text_input_element:
             previous_text_value = text_input_element.get("text", None)
 
-    output = erase_text_controller(nb_chars=nb_chars)
+    try:
+        before_seq = await get_latest_screen_seq()
+    except Exception:
+        before_seq = state.latest_screen_seq
+    output = await erase_text_controller(nb_chars=nb_chars)
     has_failed = output is not None
 
-    wait_for_animation_to_end(timeout=WaitTimeout.MEDIUM)
-
-    screen_data: ScreenDataResponse = get_screen_data()
-    latest_ui_hierarchy = screen_data.elements
+    # first frame captured after the erase, instead of waiting for animations to end
+    screen_data: ScreenDataResponse = await get_screen_data(
+        after_seq=before_seq,
+        timeout_ms=WaitTimeout.MEDIUM.value,
+        include_screenshot=False,
+    )
 
-    if not has_failed and latest_ui_hierarchy is not None:
+    if not has_failed:
         text_input_element = find_element_by_resource_id(
-            ui_hierarchy=latest_ui_hierarchy, resource_id=input_text_resource_id
+            ui_hierarchy=screen_data.elements, resource_id=input_text_resource_id
         )
         if text_input_element:
             new_text_value = text_input_element.get("text", None)
@@ -4,13 +4,15 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import input_text as input_text_controller
+from mobile_use.controllers.async_mobile_command_controller import (
+    input_text as input_text_controller,
+)
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def input_text(
+async def input_text(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -34,7 +36,7 @@ def input_text(
     Tip:
         Use `copyTextFrom` to reuse generated inputs in later steps.
     """
-    output = input_text_controller(text=text)
+    output = await input_text_controller(text=text)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
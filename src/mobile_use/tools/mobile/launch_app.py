@@ -4,20 +4,22 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import launch_app as launch_app_controller
+from mobile_use.controllers.async_mobile_command_controller import (
+    launch_app as launch_app_controller,
+)
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def launch_app(
+async def launch_app(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
     package_name: str,
 ):
     """Launch an application on the device using the package name on Android, bundle id on iOS."""
-    output = launch_app_controller(package_name)
+    output = await launch_app_controller(package_name)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
@@ -4,13 +4,13 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import open_link as open_link_controller
+from mobile_use.controllers.async_mobile_command_controller import open_link as open_link_controller
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def open_link(
+async def open_link(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -19,7 +19,7 @@ def open_link(
     """
     Open a link on a device (i.e. a deep link).
     """
-    output = open_link_controller(url=url)
+    output = await open_link_controller(url=url)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
@@ -4,13 +4,15 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import paste_text as paste_text_controller
+from mobile_use.controllers.async_mobile_command_controller import (
+    paste_text as paste_text_controller,
+)
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def paste_text(
+async def paste_text(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -26,7 +28,7 @@ def paste_text(
         - tapOn: { id: "searchFieldId" }
         - pasteText
     """
-    output = paste_text_controller()
+    output = await paste_text_controller()
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
@@ -4,21 +4,21 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
+from mobile_use.controllers.async_mobile_command_controller import press_key as press_key_controller
 from mobile_use.controllers.mobile_command_controller import Key
-from mobile_use.controllers.mobile_command_controller import press_key as press_key_controller
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def press_key(
+async def press_key(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
     key: Key,
 ):
     """Press a key on the device."""
-    output = press_key_controller(key)
+    output = await press_key_controller(key)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
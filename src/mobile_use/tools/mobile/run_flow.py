@@ -2,13 +2,13 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import run_flow as run_flow_controller
+from mobile_use.controllers.async_mobile_command_controller import run_flow as run_flow_controller
 from mobile_use.tools.tool_wrapper import ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def run_flow(
+async def run_flow(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     flow_steps: list,
@@ -17,7 +17,7 @@ def run_flow(
     """
     Run a flow i.e, a sequence of commands.
     """
-    output = run_flow_controller(flow_steps=flow_steps, dry_run=dry_run)
+    output = await run_flow_controller(flow_steps=flow_steps, dry_run=dry_run)
     return Command(
         update={
             "agents_thoughts": [agent_thought],
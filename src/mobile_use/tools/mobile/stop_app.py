@@ -4,13 +4,13 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import stop_app as stop_app_controller
+from mobile_use.controllers.async_mobile_command_controller import stop_app as stop_app_controller
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def stop_app(
+async def stop_app(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -20,7 +20,7 @@ def stop_app(
     Stops current application if it is running.
     You can also specify the package name of the app to be stopped.
     """
-    output = stop_app_controller(package_name=package_name)
+    output = await stop_app_controller(package_name=package_name)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
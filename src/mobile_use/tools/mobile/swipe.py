@@ -4,14 +4,14 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
+from mobile_use.controllers.async_mobile_command_controller import swipe as swipe_controller
 from mobile_use.controllers.mobile_command_controller import SwipeRequest
-from mobile_use.controllers.mobile_command_controller import swipe as swipe_controller
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def swipe(
+async def swipe(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -20,7 +20,7 @@ def swipe(
     """
     Swipes on the screen.
     """
-    output = swipe_controller(swipe_request=swipe_request)
+    output = await swipe_controller(swipe_request=swipe_request)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
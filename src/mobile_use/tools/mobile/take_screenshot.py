@@ -1,19 +1,19 @@
+import base64
 from typing import Optional
 
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import (
+from mobile_use.controllers.async_mobile_command_controller import (
     take_screenshot as take_screenshot_controller,
 )
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
-from mobile_use.utils.media import compress_base64_jpeg
 from typing_extensions import Annotated
 
 
 @tool
-def take_screenshot(
+async def take_screenshot(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -25,8 +25,8 @@ def take_screenshot(
     has_failed = False
 
     try:
-        output = take_screenshot_controller()
-        compressed_image_base64 = compress_base64_jpeg(output)
+        output = await take_screenshot_controller(image_format="jpeg", quality=50)
+        compressed_image_base64 = base64.b64encode(output).decode("utf-8")
     except Exception as e:
         output = str(e)
         has_failed = True
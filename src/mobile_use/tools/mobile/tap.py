@@ -3,26 +3,42 @@ from typing import Optional
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
+from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import SelectorRequest
-from mobile_use.controllers.mobile_command_controller import tap as tap_controller
+from mobile_use.controllers.async_mobile_command_controller import tap as tap_controller
+from mobile_use.controllers.mobile_command_controller import (
+    SelectorRequest,
+    get_element_ref_selector,
+)
+from mobile_use.graph.state import State
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def tap(
+async def tap(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
-    selector_request: SelectorRequest,
+    state: Annotated[State, InjectedState],
+    selector_request: Optional[SelectorRequest] = None,
     index: Optional[int] = None,
+    element_ref: Optional[int] = None,
 ):
     """
-    Taps on a selector.
+    Taps on a selector, or on the element of the given mark (`element_ref`, the <n> of #<n>).
     Index is optional and is used when you have multiple views matching the same selector.
     """
-    output = tap_controller(selector_request=selector_request, index=index)
+    if element_ref is not None:
+        selector_request = get_element_ref_selector(state.latest_ui_hierarchy or [], element_ref)
+    if selector_request is None:
+        output = (
+            f"No element #{element_ref} on the latest screen"
+            if element_ref is not None
+            else "Either a selector_request or an element_ref is required"
+        )
+    else:
+        output = await tap_controller(selector_request=selector_request, index=index)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
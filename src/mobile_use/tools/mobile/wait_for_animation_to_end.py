@@ -4,16 +4,16 @@ from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.types import Command
-from mobile_use.controllers.mobile_command_controller import WaitTimeout
-from mobile_use.controllers.mobile_command_controller import (
+from mobile_use.controllers.async_mobile_command_controller import (
     wait_for_animation_to_end as wait_for_animation_to_end_controller,
 )
+from mobile_use.controllers.mobile_command_controller import WaitTimeout
 from mobile_use.tools.tool_wrapper import ExecutorMetadata, ToolWrapper
 from typing_extensions import Annotated
 
 
 @tool
-def wait_for_animation_to_end(
+async def wait_for_animation_to_end(
     tool_call_id: Annotated[str, InjectedToolCallId],
     agent_thought: str,
     executor_metadata: Optional[ExecutorMetadata],
@@ -30,7 +30,7 @@ def wait_for_animation_to_end(
         - waitForAnimationToEnd
         - waitForAnimationToEnd: { timeout: 5000 }
     """
-    output = wait_for_animation_to_end_controller(timeout=timeout)
+    output = await wait_for_animation_to_end_controller(timeout=timeout)
     has_failed = output is not None
     tool_message = ToolMessage(
         tool_call_id=tool_call_id,
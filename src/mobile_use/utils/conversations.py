@@ -1,7 +1,13 @@
-from typing import TypeGuard
+import base64
+from typing import Optional, TypeGuard
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
 from mobile_use.constants import FAST_NON_UI_TOOLS
+from mobile_use.utils.logger import get_logger
+from mobile_use.utils.media import draw_element_marks
+from mobile_use.utils.ui_hierarchy import get_element_bounds, get_element_marks
+
+logger = get_logger(__name__)
 
 
 def is_fast_nonui_tool(tool_message: ToolMessage) -> bool:
@@ -24,7 +30,20 @@ def is_tool_for_name(tool_message: ToolMessage, name: str) -> bool:
     return tool_message.name == name
 
 
-def get_screenshot_message_for_llm(screenshot_base64: str):
+def get_screenshot_message_for_llm(
+    screenshot_base64: str,
+    ui_hierarchy: Optional[list] = None,
+    screen_size: Optional[tuple[int, int]] = None,
+):
+    """
+    Screenshot message for an LLM.
+    When a UI hierarchy is given, the marks of its elements (see get_element_marks) are drawn
+    over the screenshot.
+    """
+    if ui_hierarchy:
+        screenshot_base64 = add_element_marks_to_screenshot(
+            screenshot_base64, ui_hierarchy, screen_size
+        )
     prefix = "" if screenshot_base64.startswith("data:image") else "data:image/jpeg;base64,"
     return HumanMessage(
         content=[
@@ -34,3 +53,20 @@ def get_screenshot_message_for_llm(screenshot_base64: str):
             }
         ]
     )
+
+
+def add_element_marks_to_screenshot(
+    screenshot_base64: str, ui_hierarchy: list, screen_size: Optional[tuple[int, int]]
+) -> str:
+    marks = {
+        mark: bounds
+        for mark, element in get_element_marks(ui_hierarchy).items()
+        if (bounds := get_element_bounds(element)) is not None
+    }
+    try:
+        screenshot = base64.b64decode(screenshot_base64.split(",", 1)[-1])
+        marked_screenshot = draw_element_marks(screenshot, marks, screen_size=screen_size)
+    except Exception as e:
+        logger.warning(f"Could not draw the element marks on the screenshot: {e}")
+        return screenshot_base64
+    return base64.b64encode(marked_screenshot).decode("utf-8")
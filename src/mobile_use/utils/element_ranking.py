@@ -0,0 +1,119 @@
+"""
+Lexical relevance ranking of UI elements (BM25), to give the LLM the part of a screen that
+matters for the task at hand rather than every element on it.
+Works on compacted UI hierarchies (see ui_hierarchy.compact_ui_hierarchy).
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Iterator, Optional
+
+# Element properties searched, with the ids split into words (app:id/search_bar -> search, bar)
+SEARCHED_ELEMENT_KEYS = ("text", "accessibilityText", "hintText", "resourceId")
+BM25_K1 = 1.2
+BM25_B = 0.75
+CLICKABLE_BOOST = 1.5
+FOCUSED_BOOST = 2.0
+_CAMEL_CASE_BOUNDARY = re.compile(r"(?<=[a-z])(?=[A-Z])")
+_WORD = re.compile(r"[^\W_]+")
+
+ElementPath = tuple[int, ...]
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(_CAMEL_CASE_BOUNDARY.sub(" ", text).lower())
+
+
+def iter_elements_with_path(
+    elements: list[dict], parent_path: ElementPath = ()
+) -> Iterator[tuple[ElementPath, dict]]:
+    for index, element in enumerate(elements):
+        path = (*parent_path, index)
+        yield path, element
+        yield from iter_elements_with_path(element.get("children", []), path)
+
+
+def get_element_tokens(element: dict) -> list[str]:
+    tokens = []
+    for key in SEARCHED_ELEMENT_KEYS:
+        value = element.get(key)
+        if isinstance(value, str):
+            # ids are only worth their last part, the package name is the same everywhere
+            tokens += tokenize(value.rsplit("/", 1)[-1] if key == "resourceId" else value)
+    return tokens
+
+
+def score_elements(elements: list[dict], query: str) -> list[float]:
+    """BM25 score of each element against the query, boosted for clickable and focused ones."""
+    documents = [Counter(get_element_tokens(element)) for element in elements]
+    if not documents:
+        return []
+    average_length = sum(sum(document.values()) for document in documents) / len(documents)
+    query_terms = set(tokenize(query))
+    document_frequencies = {
+        term: sum(1 for document in documents if term in document) for term in query_terms
+    }
+
+    scores = []
+    for element, document in zip(elements, documents):
+        length = sum(document.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if frequency == 0:
+                continue
+            df = document_frequencies[term]
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            length_norm = 1 - BM25_B + BM25_B * length / (average_length or 1)
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+        if element.get("clickable"):
+            score *= CLICKABLE_BOOST
+        if element.get("focused"):
+            score *= FOCUSED_BOOST
+        scores.append(score)
+    return scores
+
+
+def select_relevant_elements(compacted: list[dict], query: str, top_k: int) -> Optional[list[dict]]:
+    """
+    Keeps the `top_k` elements of a compacted UI hierarchy most relevant to the query, along
+    with focused elements and the ancestors of both (without their other children).
+    None when the whole hierarchy should be used instead: it has at most `top_k` elements, or
+    none of them is related to the query.
+    """
+    paths, elements = [], []
+    for path, element in iter_elements_with_path(compacted):
+        paths.append(path)
+        elements.append(element)
+    if len(elements) <= top_k:
+        return None
+    scores = score_elements(elements, query)
+    ranked = sorted(
+        (index for index, score in enumerate(scores) if score > 0), key=lambda i: -scores[i]
+    )
+    if not ranked:
+        return None
+
+    selected = {paths[index] for index in ranked[:top_k]}
+    selected |= {path for path, element in zip(paths, elements) if element.get("focused")}
+    kept = {path[:length] for path in selected for length in range(1, len(path) + 1)}
+
+    def keep(elements: list[dict], parent_path: ElementPath) -> list[dict]:
+        kept_elements = []
+        for index, element in enumerate(elements):
+            path = (*parent_path, index)
+            if path not in kept:
+                continue
+            kept_element = {key: value for key, value in element.items() if key != "children"}
+            children = keep(element.get("children", []), path)
+            if children:
+                kept_element["children"] = children
+            kept_elements.append(kept_element)
+        return kept_elements
+
+    return keep(compacted, ())
+
+
+def count_elements(compacted: list[dict]) -> int:
+    return sum(1 for _ in iter_elements_with_path(compacted))
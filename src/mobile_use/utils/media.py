@@ -1,23 +1,82 @@
-import base64
 import json
 from io import BytesIO
 from pathlib import Path
+from typing import Literal, Optional
 
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 
+ImageFormat = Literal["png", "jpeg", "webp"]
 
-def compress_base64_jpeg(base64_str: str, quality: int = 50) -> str:
-    if base64_str.startswith("data:image"):
-        base64_str = base64_str.split(",")[1]
 
-    image_data = base64.b64decode(base64_str)
+def encode_image(
+    image_data: bytes,
+    image_format: ImageFormat,
+    quality: int = 80,
+    max_size: Optional[int] = None,
+) -> bytes:
+    """
+    Re-encodes an image into the given format.
+    `max_size` bounds the largest dimension (aspect ratio is preserved, never upscaled).
+    `quality` only applies to lossy formats (jpeg, webp).
+    """
     image = Image.open(BytesIO(image_data))
-
-    compressed_io = BytesIO()
-    image.save(compressed_io, format="JPEG", quality=quality, optimize=True)
-
-    compressed_base64 = base64.b64encode(compressed_io.getvalue()).decode("utf-8")
-    return compressed_base64
+    if max_size and max(image.size) > max_size:
+        image.thumbnail((max_size, max_size))
+    if image_format == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    encoded_io = BytesIO()
+    if image_format == "png":
+        image.save(encoded_io, format="PNG", optimize=True)
+    else:
+        image.save(encoded_io, format=image_format.upper(), quality=quality)
+    return encoded_io.getvalue()
+
+
+def get_image_dhash(image_data: bytes, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image: a `hash_size`² bits perceptual hash computed on a tiny grayscale
+    thumbnail. Visually similar images get hashes at a small Hamming distance.
+    """
+    image = Image.open(BytesIO(image_data))
+    image.draft("L", (hash_size * 8, hash_size * 8))
+    pixels = list(image.convert("L").resize((hash_size + 1, hash_size)).getdata())
+    dhash = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            dhash = (dhash << 1) | (left > right)
+    return dhash
+
+
+def draw_element_marks(
+    image_data: bytes,
+    marks: dict[int, tuple[int, int, int, int]],
+    screen_size: Optional[tuple[int, int]] = None,
+    quality: int = 80,
+) -> bytes:
+    """
+    Draws numbered boxes over a screenshot, one per mark, from (left, top, right, bottom) bounds.
+    Bounds are in screen coordinates, scaled to the image when `screen_size` differs from it
+    (e.g. iOS points). Returns a JPEG.
+    """
+    image = Image.open(BytesIO(image_data)).convert("RGB")
+    scale_x = image.width / screen_size[0] if screen_size else 1
+    scale_y = image.height / screen_size[1] if screen_size else 1
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=max(12, image.width // 40))
+    for mark, (left, top, right, bottom) in marks.items():
+        box = (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y)
+        draw.rectangle(box, outline=(255, 0, 0), width=2)
+        label = str(mark)
+        label_box = draw.textbbox((box[0], box[1]), label, font=font)
+        draw.rectangle(label_box, fill=(255, 0, 0))
+        draw.text((box[0], box[1]), label, fill=(255, 255, 255), font=font)
+
+    encoded_io = BytesIO()
+    image.save(encoded_io, format="JPEG", quality=quality)
+    return encoded_io.getvalue()
 
 
 def create_gif_from_trace_folder(trace_folder_path: Path):
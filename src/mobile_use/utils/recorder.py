@@ -1,4 +1,3 @@
-import base64
 import time
 from pathlib import Path
 
@@ -7,20 +6,20 @@ from mobile_use.config import record_events
 from mobile_use.context import get_execution_setup
 from mobile_use.controllers.mobile_command_controller import take_screenshot
 from mobile_use.utils.logger import get_logger
-from mobile_use.utils.media import compress_base64_jpeg
 
 logger = get_logger(__name__)
 
 
 def record_interaction(response: BaseMessage):
     logger.info("Recording interaction")
-    screenshot_base64 = take_screenshot()
-    logger.info("Screenshot taken")
     try:
-        compressed_screenshot_base64 = compress_base64_jpeg(screenshot_base64, 20)
+        # served from the latest frame of the screen stream (no new capture): the reducer calling
+        # this does not know which frame the thought was about, so /frames cannot tell a better one
+        compressed_screenshot = take_screenshot(image_format="jpeg", quality=20)
     except Exception as e:
-        logger.error(f"Error compressing screenshot: {e}")
+        logger.error(f"Error taking screenshot: {e}")
         return "Could not record this interaction"
+    logger.info("Screenshot taken")
     timestamp = time.time()
     folder = (
         Path(__file__).parent.joinpath(f"../../traces/{get_execution_setup().trace_id}").resolve()
@@ -31,7 +30,7 @@ def record_interaction(response: BaseMessage):
             folder.joinpath(f"{int(timestamp)}.jpeg").resolve(),
             "wb",
         ) as f:
-            f.write(base64.b64decode(compressed_screenshot_base64))
+            f.write(compressed_screenshot)
 
         with open(
             folder.joinpath(f"{int(timestamp)}.json").resolve(),
@@ -1,3 +1,4 @@
+import httpx
 import requests
 from mobile_use.utils.logger import get_logger
 
@@ -35,3 +36,26 @@ def get_session_with_curl_logging() -> requests.Session:
     session = requests.Session()
     session.hooks["response"] = [logging_hook]
     return session
+
+
+def curl_from_httpx_request(req: httpx.Request) -> str:
+    """Converts an httpx.Request object to a valid cURL command string."""
+    command = ["curl", f"-X {req.method}"]
+
+    for key, value in req.headers.items():
+        command.append(f'-H "{key}: {value}"')
+
+    if req.content:
+        # Escape single quotes in the body for shell safety
+        body = req.content.decode("utf-8", errors="replace").replace("'", "'\\''")
+        command.append(f"-d '{body}'")
+
+    command.append(f"'{req.url}'")
+
+    return " ".join(command)
+
+
+async def log_async_response(response: httpx.Response):
+    """httpx event hook logging the request as a cURL command."""
+    curl_command = curl_from_httpx_request(response.request)
+    logger.debug(f"\n--- cURL Command ---\n{curl_command}\n--------------------")
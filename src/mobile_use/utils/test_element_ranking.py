@@ -0,0 +1,22 @@
+from mobile_use.utils.element_ranking import select_relevant_elements
+
+
+def test_select_relevant_elements_keeps_matches_and_their_ancestors():
+    compacted = [
+        {
+            "resourceId": "app:id/list",
+            "children": [{"text": f"Setting {index}", "clickable": True} for index in range(10)]
+            + [{"text": "Wi-Fi", "resourceId": "app:id/wifi_toggle", "clickable": True}],
+        },
+        {"text": "Search", "focused": True},
+    ]
+
+    assert select_relevant_elements(compacted, "Turn on the wifi", top_k=1) == [
+        {
+            "resourceId": "app:id/list",
+            "children": [{"text": "Wi-Fi", "resourceId": "app:id/wifi_toggle", "clickable": True}],
+        },
+        {"text": "Search", "focused": True},
+    ]
+    assert select_relevant_elements(compacted, "Open the camera", top_k=1) is None
+    assert select_relevant_elements(compacted, "Turn on the wifi", top_k=20) is None
@@ -0,0 +1,203 @@
+from mobile_use.utils.ui_hierarchy import (
+    UIHierarchyIndex,
+    diff_ui_hierarchies,
+    find_element_by_resource_id,
+    find_elements_by_selector,
+    get_element_center,
+    get_element_marks,
+    get_ui_hierarchy_fingerprint,
+    get_ui_hierarchy_prompt,
+    normalize_ui_hierarchy,
+)
+
+
+def test_fingerprint_ignores_per_frame_ids():
+    before = [{"id": "a1", "text": "OK", "children": [{"id": "b1", "text": "child"}]}]
+    after = [{"id": "a2", "text": "OK", "children": [{"id": "b2", "text": "child"}]}]
+
+    assert get_ui_hierarchy_fingerprint(before) == get_ui_hierarchy_fingerprint(after)
+
+
+def test_diff_reports_added_removed_and_changed_nodes():
+    before = [
+        {"id": "1", "resourceId": "app:id/title", "text": "Inbox"},
+        {"id": "2", "resourceId": "app:id/search", "text": ""},
+        {"id": "3", "resourceId": "app:id/row", "text": "first"},
+        {"id": "4", "resourceId": "app:id/row", "text": "second"},
+    ]
+    after = [
+        {"id": "5", "resourceId": "app:id/title", "text": "Inbox"},
+        {"id": "6", "resourceId": "app:id/search", "text": "hello"},
+        {"id": "7", "resourceId": "app:id/row", "text": "first"},
+        {"id": "8", "resourceId": "app:id/clear", "text": "Clear"},
+    ]
+
+    diff = diff_ui_hierarchies(before, after)
+
+    assert [change.key for change in diff.changed] == ["/app:id/search[0]"]
+    assert diff.changed[0].before == {"text": ""}
+    assert diff.changed[0].after == {"text": "hello"}
+    assert diff.added == {"/app:id/clear[0]": {"resourceId": "app:id/clear", "text": "Clear"}}
+    assert list(diff.removed) == ["/app:id/row[1]"]
+    assert diff.has_changes
+    assert not diff_ui_hierarchies(before, before).has_changes
+
+
+def test_find_elements_by_selector_follows_maestro_matching():
+    ui_hierarchy = [
+        {
+            "resourceId": "com.app:id/list",
+            "bounds": {"x": 0, "y": 0, "width": 1080, "height": 2000},
+            "children": [
+                {
+                    "resourceId": "com.app:id/row",
+                    "text": "Second",
+                    "bounds": {"x": 0, "y": 200, "width": 1080, "height": 100},
+                },
+                {
+                    "resourceId": "com.app:id/row",
+                    "text": "First",
+                    "bounds": {"x": 0, "y": 100, "width": 1080, "height": 100},
+                },
+                {"resourceId": "com.app:id/row", "text": "Hidden", "bounds": "[0,0][0,0]"},
+                {"accessibilityText": "Search", "bounds": "[900,20][1000,80]"},
+            ],
+        }
+    ]
+
+    rows = find_elements_by_selector(ui_hierarchy, resource_id="row")
+    assert [row["text"] for row in rows] == ["First", "Second"]
+    assert find_elements_by_selector(ui_hierarchy, resource_id="com.app:id/row", text="sec.*")
+    assert get_element_center(find_elements_by_selector(ui_hierarchy, text="search")[0]) == (
+        950,
+        50,
+    )
+    assert find_elements_by_selector(ui_hierarchy, text="Hidden") == []
+
+
+def test_compact_prompt_prunes_wrappers_defaults_and_empty_elements():
+    ui_hierarchy = [
+        {
+            "id": "1",
+            "bounds": {"x": 0, "y": 0, "width": 1080, "height": 2400},
+            "enabled": True,
+            "children": [
+                {"id": "2", "text": "", "bounds": {"x": 0, "y": 0, "width": 0, "height": 0}},
+                {
+                    "id": "3",
+                    "text": "Sign in",
+                    "resourceId": "app:id/login",
+                    "clickable": True,
+                    "enabled": True,
+                    "bounds": {"x": 10.4, "y": 20, "width": 100, "height": 50},
+                    "children": [{"id": "4", "accessibilityText": "Sign in button"}],
+                },
+            ],
+        }
+    ]
+
+    assert get_ui_hierarchy_prompt(ui_hierarchy) == (
+        '"Sign in" id=app:id/login clickable [10,20][110,70]\n  desc="Sign in button"'
+    )
+    assert get_ui_hierarchy_prompt(ui_hierarchy, detail="full").startswith("[0,0][1080,2400]\n")
+
+
+def test_element_marks_number_actionable_elements_in_the_compact_prompt():
+    ui_hierarchy = [
+        {
+            "bounds": "[0,0][1080,2400]",
+            "children": [
+                {"text": "Hidden", "bounds": "[0,0][0,0]"},
+                {"text": "Title", "bounds": "[0,0][1080,100]"},
+                {"clickable": True, "bounds": "[0,100][100,200]"},
+            ],
+        }
+    ]
+
+    marks = get_element_marks(ui_hierarchy)
+
+    assert [element.get("text") for element in marks.values()] == ["Title", None]
+    assert get_ui_hierarchy_prompt(ui_hierarchy, with_marks=True) == (
+        '#1 "Title" [0,0][1080,100]\n#2 clickable [0,100][100,200]'
+    )
+
+
+def test_normalize_culls_offscreen_elements_and_collapses_repeated_rows():
+    rows = [
+        {
+            "resourceId": "app:id/row",
+            "bounds": f"[0,{top}][100,{top + 100}]",
+            "children": [{"resourceId": "app:id/title", "text": f"Row {top // 100}"}],
+        }
+        for top in range(0, 1500, 100)
+    ]
+    ui_hierarchy = [{"resourceId": "app:id/list", "bounds": "[0,0][100,1000]", "children": rows}]
+
+    normalized = normalize_ui_hierarchy(
+        ui_hierarchy, screen_size=(100, 1000), max_repeated_siblings=3
+    )
+
+    assert normalized[0]["children"][:3] == rows[:3]
+    # rows 10 to 14 are off-screen, rows 3 to 9 are collapsed
+    assert normalized[0]["children"][3:] == [{"collapsedSiblings": 7}]
+
+
+def test_index_lookups_match_tree_walks():
+    ui_hierarchy = [
+        {
+            "resourceId": "app:id/form",
+            "bounds": "[0,0][100,200]",
+            "children": [
+                {"resourceId": "app:id/name", "text": "Alice", "bounds": "[0,0][100,50]"},
+                {"resourceId": "app:id/name", "text": "Bob", "bounds": "[0,50][100,100]"},
+            ],
+        }
+    ]
+
+    index = UIHierarchyIndex(ui_hierarchy)
+
+    assert len(index) == 3
+    assert index.find_by_resource_id("app:id/name") == find_element_by_resource_id(
+        ui_hierarchy, "app:id/name"
+    )
+    assert index.find_by_text("Bob")["resourceId"] == "app:id/name"
+    assert index.find_by_resource_id("app:id/missing") is None
+    assert index.get_parent(index.find_by_text("Bob")) is ui_hierarchy[0]
+    assert index.find_at_point(10, 60)["text"] == "Bob"
+    assert index.find_at_point(10, 150) is ui_hierarchy[0]
+
+
+def test_index_point_and_selector_lookups_match_linear_scans():
+    rows = [
+        {
+            "resourceId": "app:id/row",
+            "text": f"Item {index}",
+            "clickable": True,
+            "bounds": f"[0,{index * 150}][1080,{index * 150 + 150}]",
+        }
+        for index in range(20)
+    ]
+    ui_hierarchy = [
+        {"resourceId": "app:id/scroll", "bounds": "[0,0][1080,100000]", "children": rows},
+        {"resourceId": "app:id/fab", "accessibilityText": "New", "bounds": "[900,2100][1000,2200]"},
+    ]
+
+    index = UIHierarchyIndex(ui_hierarchy)
+
+    assert index.find_at_point(950, 2150) is ui_hierarchy[1]
+    assert index.find_at_point(10, 160) is rows[1]
+    # only in the huge scroll content, kept out of the grid
+    assert index.find_at_point(10, 50000) is ui_hierarchy[0]
+    assert index.find_at_point(-1, 10) is None
+    for resource_id, text in [
+        ("row", "item 3"),
+        ("app:id/ROW", None),
+        (None, "Item 1.*"),
+        (None, "new"),
+        ("app:id/fab", "Item 3"),
+    ]:
+        assert index.find_all_by_selector(resource_id=resource_id, text=text) == (
+            find_elements_by_selector(ui_hierarchy, resource_id=resource_id, text=text)
+        )
+    assert index.get_element_by_mark(3) is rows[1]
+    assert index.get_element_by_mark(len(rows) + 3) is None
@@ -1,4 +1,59 @@
-from typing import Optional
+import hashlib
+import json
+import re
+from itertools import chain
+from typing import Any, Iterable, Iterator, Literal, Optional
+
+from pydantic import BaseModel
+
+# Keys regenerated by the device bridge for every frame, which do not describe the UI itself
+VOLATILE_ELEMENT_KEYS = {"id"}
+# Element keys matched by a Maestro text selector
+TEXT_ELEMENT_KEYS = ("text", "hintText", "accessibilityText")
+# Same options as Maestro's selector regexes
+SELECTOR_REGEX_FLAGS = re.IGNORECASE | re.DOTALL | re.MULTILINE
+_BOUNDS_STRING = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+# Selector values without any of these are matched literally, which indexes can look up
+_REGEX_SPECIAL_CHARACTERS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+# Placeholder of the siblings removed by collapse_repeated_siblings, holding their count
+COLLAPSED_SIBLINGS_KEY = "collapsedSiblings"
+
+# How much of each element is kept in compact UI hierarchies (see compact_ui_hierarchy):
+# - minimal: texts, ids and clickability
+# - standard: minimal + hint texts and state flags (enabled, checked, focused...)
+# - full: every property, and wrapper nodes are kept
+UIHierarchyDetail = Literal["minimal", "standard", "full"]
+_DETAIL_KEYS: dict[str, Optional[tuple[str, ...]]] = {
+    "minimal": ("text", "resourceId", "accessibilityText", "clickable", COLLAPSED_SIBLINGS_KEY),
+    "standard": (
+        "text",
+        "resourceId",
+        "accessibilityText",
+        "hintText",
+        "clickable",
+        "enabled",
+        "focused",
+        "checked",
+        "selected",
+        "scrollable",
+        "password",
+        COLLAPSED_SIBLINGS_KEY,
+    ),
+    "full": None,
+}
+# Property values that are not worth mentioning
+ELEMENT_DEFAULT_VALUES: dict[str, Any] = {
+    "clickable": False,
+    "enabled": True,
+    "focused": False,
+    "checked": False,
+    "selected": False,
+    "scrollable": False,
+    "password": False,
+}
+# Short names of the properties in the line-oriented format
+_COMPACT_KEY_NAMES = {"resourceId": "id", "accessibilityText": "desc", "hintText": "hint"}
 
 
 def find_element_by_resource_id(ui_hierarchy: list[dict], resource_id: str) -> Optional[dict]:
@@ -28,3 +83,613 @@ def find_element_by_resource_id(ui_hierarchy: list[dict], resource_id: str) -> O
         return None
 
     return search_recursive(ui_hierarchy)
+
+
+def strip_volatile_keys(ui_hierarchy: list[dict]) -> list[dict]:
+    """Returns a copy of the UI hierarchy without per-frame keys (see VOLATILE_ELEMENT_KEYS)."""
+
+    def strip(element):
+        if not isinstance(element, dict):
+            return element
+        stripped = {k: v for k, v in element.items() if k not in VOLATILE_ELEMENT_KEYS}
+        children = element.get("children")
+        if isinstance(children, list):
+            stripped["children"] = [strip(child) for child in children]
+        return stripped
+
+    return [strip(element) for element in ui_hierarchy]
+
+
+def get_ui_hierarchy_fingerprint(ui_hierarchy: list[dict]) -> str:
+    """
+    Content hash of a UI hierarchy.
+    Two frames showing the same UI get the same fingerprint, even if their element ids differ.
+    """
+    serialized = json.dumps(
+        strip_volatile_keys(ui_hierarchy), sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def get_element_properties(element: dict) -> dict:
+    """The element's own properties: without its children and per-frame keys."""
+    return {k: v for k, v in element.items() if k != "children" and k not in VOLATILE_ELEMENT_KEYS}
+
+
+def get_elements_by_key(ui_hierarchy: list[dict]) -> dict[str, dict]:
+    """
+    Flattens a UI hierarchy into a mapping of stable node identities to elements.
+
+    A node is identified by the path of its ancestors and, among its siblings, by its
+    resource-id (or class) and its ordinal within siblings sharing it.
+    Text, bounds and other properties are left out of the identity, so that editing a field
+    or moving an element shows up as a change rather than a removal and an addition.
+    """
+    elements_by_key: dict[str, dict] = {}
+
+    def visit(elements: list, parent_key: str):
+        seen: dict[str, int] = {}
+        for element in elements:
+            if not isinstance(element, dict):
+                continue
+            name = element.get("resourceId") or element.get("class") or "node"
+            ordinal = seen.get(name, 0)
+            seen[name] = ordinal + 1
+            key = f"{parent_key}/{name}[{ordinal}]"
+            elements_by_key[key] = element
+            children = element.get("children")
+            if isinstance(children, list):
+                visit(children, key)
+
+    visit(ui_hierarchy, "")
+    return elements_by_key
+
+
+class UIElementChange(BaseModel):
+    key: str
+    before: dict[str, Any]
+    after: dict[str, Any]
+
+
+class UIHierarchyDiff(BaseModel):
+    added: dict[str, dict[str, Any]] = {}
+    removed: dict[str, dict[str, Any]] = {}
+    changed: list[UIElementChange] = []
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_ui_hierarchies(before: list[dict], after: list[dict]) -> UIHierarchyDiff:
+    """
+    Structural delta between two UI hierarchies, keyed by node identity
+    (see get_elements_by_key).
+    Added and removed nodes are given with their own properties only (no children).
+    Changed nodes list the properties that differ, with their value in each hierarchy.
+    """
+    before_elements = get_elements_by_key(before)
+    after_elements = get_elements_by_key(after)
+
+    diff = UIHierarchyDiff()
+    for key, element in after_elements.items():
+        if key not in before_elements:
+            diff.added[key] = get_element_properties(element)
+            continue
+        old_properties = get_element_properties(before_elements[key])
+        new_properties = get_element_properties(element)
+        if old_properties == new_properties:
+            continue
+        changed_keys = [
+            k
+            for k in old_properties.keys() | new_properties.keys()
+            if old_properties.get(k) != new_properties.get(k)
+        ]
+        diff.changed.append(
+            UIElementChange(
+                key=key,
+                before={k: old_properties.get(k) for k in sorted(changed_keys)},
+                after={k: new_properties.get(k) for k in sorted(changed_keys)},
+            )
+        )
+    for key, element in before_elements.items():
+        if key not in after_elements:
+            diff.removed[key] = get_element_properties(element)
+    return diff
+
+
+def iter_elements(ui_hierarchy: list) -> Iterator[dict]:
+    """Depth-first iteration over all elements of a UI hierarchy."""
+    for element in ui_hierarchy:
+        if not isinstance(element, dict):
+            continue
+        yield element
+        children = element.get("children")
+        if isinstance(children, list):
+            yield from iter_elements(children)
+
+
+def get_element_bounds(element: dict) -> Optional[tuple[int, int, int, int]]:
+    """
+    Element bounds as (left, top, right, bottom), from either a {x, y, width, height} mapping
+    or an Android "[left,top][right,bottom]" string. None if missing or empty.
+    """
+    bounds = element.get("bounds")
+    if isinstance(bounds, dict):
+        try:
+            left, top = int(bounds["x"]), int(bounds["y"])
+            right, bottom = left + int(bounds["width"]), top + int(bounds["height"])
+        except (KeyError, TypeError, ValueError):
+            return None
+    elif isinstance(bounds, str) and (match := _BOUNDS_STRING.fullmatch(bounds.strip())):
+        left, top, right, bottom = (int(value) for value in match.groups())
+    else:
+        return None
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def get_element_center(element: dict) -> Optional[tuple[int, int]]:
+    bounds = get_element_bounds(element)
+    if bounds is None:
+        return None
+    left, top, right, bottom = bounds
+    return (left + right) // 2, (top + bottom) // 2
+
+
+def _matches_selector_value(pattern: str, value: Optional[str]) -> bool:
+    if not value:
+        return False
+    if value == pattern:
+        return True
+    try:
+        return re.fullmatch(pattern, value, SELECTOR_REGEX_FLAGS) is not None
+    except re.error:
+        return False
+
+
+def find_elements_by_selector(
+    ui_hierarchy: list,
+    resource_id: Optional[str] = None,
+    text: Optional[str] = None,
+) -> list[dict]:
+    """
+    Find the visible UI elements matching a Maestro id and/or text selector.
+
+    As in Maestro, selector values are regexes that must match the whole value (case-insensitive),
+    an id matches either the full resource-id or its part after the last '/', and a text matches
+    the text, hint text or accessibility text of the element.
+    Matches are sorted top to bottom then left to right, the order used by selector indexes.
+    """
+    return _sort_selector_matches(
+        element
+        for element in iter_elements(ui_hierarchy)
+        if _matches_selector(element, resource_id=resource_id, text=text)
+    )
+
+
+def _matches_selector(element: dict, resource_id: Optional[str], text: Optional[str]) -> bool:
+    if resource_id is not None:
+        element_id = element.get("resourceId")
+        if not (
+            _matches_selector_value(resource_id, element_id)
+            or _matches_selector_value(resource_id, (element_id or "").rsplit("/", 1)[-1])
+        ):
+            return False
+    if text is not None and not any(
+        _matches_selector_value(text, element.get(key)) for key in TEXT_ELEMENT_KEYS
+    ):
+        return False
+    return True
+
+
+def _sort_selector_matches(elements: Iterable[dict]) -> list[dict]:
+    """Visible elements, top to bottom then left to right."""
+    matches = []
+    for element in elements:
+        bounds = get_element_bounds(element)
+        if bounds is not None:
+            matches.append((bounds[1], bounds[0], element))
+    return [element for _, _, element in sorted(matches, key=lambda match: match[:2])]
+
+
+def is_literal_selector_value(value: str) -> bool:
+    return _REGEX_SPECIAL_CHARACTERS.search(value) is None
+
+
+def _is_default_value(key: str, value: Any) -> bool:
+    if value is None or value == "" or value == [] or value == {}:
+        return True
+    return key in ELEMENT_DEFAULT_VALUES and value == ELEMENT_DEFAULT_VALUES[key]
+
+
+def is_markable_element(element: dict) -> bool:
+    """Whether the element is worth a mark: visible, and clickable or labelled."""
+    if get_element_bounds(element) is None:
+        return False
+    if element.get("clickable") is True or element.get("resourceId"):
+        return True
+    return any(element.get(key) for key in TEXT_ELEMENT_KEYS)
+
+
+def get_element_marks(ui_hierarchy: list) -> dict[int, dict]:
+    """
+    Short numeric handles (marks) of the actionable elements of a UI hierarchy, numbered from 1
+    in depth-first order. The same hierarchy always gets the same marks, so that an element
+    referred to by its mark in a prompt can be found back in that hierarchy.
+    Elements with empty bounds are skipped along with their children, as in compact_ui_hierarchy.
+    """
+    marks: dict[int, dict] = {}
+
+    def add_marks(elements: list):
+        for element in elements:
+            if not isinstance(element, dict):
+                continue
+            if "bounds" in element and get_element_bounds(element) is None:
+                continue
+            if is_markable_element(element):
+                marks[len(marks) + 1] = element
+            children = element.get("children")
+            if isinstance(children, list):
+                add_marks(children)
+
+    add_marks(ui_hierarchy)
+    return marks
+
+
+def get_compact_element(element: dict, detail: UIHierarchyDetail = "standard") -> dict:
+    """
+    The element's own properties as kept in compact UI hierarchies (see compact_ui_hierarchy),
+    with its bounds if any.
+    """
+    keys = _DETAIL_KEYS[detail]
+    compacted = {
+        key: value
+        for key, value in get_element_properties(element).items()
+        if key != "bounds" and (keys is None or key in keys) and not _is_default_value(key, value)
+    }
+    bounds = get_element_bounds(element)
+    if bounds is not None:
+        compacted["bounds"] = list(bounds)
+    return compacted
+
+
+def compact_ui_hierarchy(
+    ui_hierarchy: list, detail: UIHierarchyDetail = "standard", with_marks: bool = False
+) -> list[dict]:
+    """
+    Reduces a UI hierarchy to what matters to describe the screen:
+    - elements with empty bounds are dropped, with their children
+    - properties are filtered by detail level, and default values (see ELEMENT_DEFAULT_VALUES)
+      and empty values are dropped
+    - bounds become integer [left, top, right, bottom] lists
+    - below the `full` detail level, wrapper elements left without any property are replaced
+      by their children
+    With `with_marks`, marked elements (see get_element_marks) get their mark as `mark`.
+    """
+    marks_by_element = (
+        {id(element): mark for mark, element in get_element_marks(ui_hierarchy).items()}
+        if with_marks
+        else {}
+    )
+
+    def compact(element) -> list[dict]:
+        if not isinstance(element, dict):
+            return []
+        if "bounds" in element and get_element_bounds(element) is None:
+            return []
+        children = element.get("children")
+        compacted_children = (
+            [child for item in children for child in compact(item)]
+            if isinstance(children, list)
+            else []
+        )
+        compacted = get_compact_element(element, detail=detail)
+        if id(element) in marks_by_element:
+            compacted = {"mark": marks_by_element[id(element)], **compacted}
+        if list(compacted) in ([], ["bounds"]) and detail != "full":
+            return compacted_children
+        if compacted_children:
+            compacted["children"] = compacted_children
+        return [compacted]
+
+    return [compacted for element in ui_hierarchy for compacted in compact(element)]
+
+
+def format_compact_element(element: dict) -> str:
+    """One line describing a compacted element, e.g. `"Sign in" id=app:id/login [0,84][540,168]`."""
+    if COLLAPSED_SIBLINGS_KEY in element:
+        return f"... {element[COLLAPSED_SIBLINGS_KEY]} more elements like the previous ones"
+    parts = []
+    if "mark" in element:
+        parts.append(f"#{element['mark']}")
+    if "text" in element:
+        parts.append(json.dumps(element["text"], ensure_ascii=False))
+    for key, value in element.items():
+        if key in ("mark", "text", "bounds", "children"):
+            continue
+        name = _COMPACT_KEY_NAMES.get(key, key)
+        if value is True:
+            parts.append(name)
+        elif isinstance(value, str):
+            quoted = " " in value or '"' in value or "\n" in value or not value
+            parts.append(f"{name}={json.dumps(value, ensure_ascii=False) if quoted else value}")
+        else:
+            parts.append(f"{name}={json.dumps(value, ensure_ascii=False, default=str)}")
+    if "bounds" in element:
+        left, top, right, bottom = element["bounds"]
+        parts.append(f"[{left},{top}][{right},{bottom}]")
+    return " ".join(parts)
+
+
+def format_compact_ui_hierarchy(compacted: list[dict], indent: str = "  ") -> str:
+    """
+    Line-oriented rendering of a compacted UI hierarchy: one element per line, children
+    indented under their parent.
+    """
+    lines = []
+
+    def add_lines(elements: list[dict], depth: int):
+        for element in elements:
+            lines.append(f"{indent * depth}{format_compact_element(element)}")
+            add_lines(element.get("children", []), depth + 1)
+
+    add_lines(compacted, 0)
+    return "\n".join(lines)
+
+
+def get_ui_hierarchy_prompt(
+    ui_hierarchy: list, detail: UIHierarchyDetail = "standard", with_marks: bool = False
+) -> str:
+    """Compact text representation of a UI hierarchy, for LLM prompts."""
+    return format_compact_ui_hierarchy(
+        compact_ui_hierarchy(ui_hierarchy, detail=detail, with_marks=with_marks)
+    )
+
+
+def cull_offscreen_elements(ui_hierarchy: list, screen_size: tuple[int, int]) -> list:
+    """
+    Drops the elements lying entirely outside the screen, along with their children.
+    Elements without bounds are kept.
+    """
+    width, height = screen_size
+
+    def is_offscreen(element: dict) -> bool:
+        bounds = get_element_bounds(element)
+        if bounds is None:
+            return False
+        left, top, right, bottom = bounds
+        return right <= 0 or bottom <= 0 or left >= width or top >= height
+
+    def cull(elements: list) -> list:
+        culled = []
+        for element in elements:
+            if not isinstance(element, dict) or is_offscreen(element):
+                continue
+            children = element.get("children")
+            if isinstance(children, list):
+                element = {**element, "children": cull(children)}
+            culled.append(element)
+        return culled
+
+    return cull(ui_hierarchy)
+
+
+def get_element_shape(element: dict) -> tuple:
+    """
+    Structure of an element regardless of its values: its identity, its property names and
+    the shapes of its children. List rows built from the same layout share the same shape.
+    """
+    children = element.get("children")
+    return (
+        element.get("resourceId") or element.get("class"),
+        tuple(sorted(get_element_properties(element))),
+        tuple(
+            get_element_shape(child)
+            for child in (children if isinstance(children, list) else [])
+            if isinstance(child, dict)
+        ),
+    )
+
+
+def collapse_repeated_siblings(ui_hierarchy: list, max_repeated: int) -> list:
+    """
+    Shortens runs of more than `max_repeated` consecutive siblings of the same shape
+    (see get_element_shape), such as the rows of a list: the first `max_repeated` are kept,
+    followed by a placeholder holding the number of siblings removed (COLLAPSED_SIBLINGS_KEY).
+    """
+
+    def collapse(elements: list) -> list:
+        collapsed: list[dict] = []
+        run_shape, run_length = None, 0
+        for element in elements:
+            if not isinstance(element, dict):
+                continue
+            shape = get_element_shape(element)
+            run_length = run_length + 1 if shape == run_shape else 1
+            run_shape = shape
+            if run_length > max_repeated:
+                if run_length == max_repeated + 1:
+                    collapsed.append({COLLAPSED_SIBLINGS_KEY: 0})
+                collapsed[-1][COLLAPSED_SIBLINGS_KEY] += 1
+                continue
+            children = element.get("children")
+            if isinstance(children, list):
+                element = {**element, "children": collapse(children)}
+            collapsed.append(element)
+        return collapsed
+
+    return collapse(ui_hierarchy)
+
+
+def normalize_ui_hierarchy(
+    ui_hierarchy: list,
+    screen_size: Optional[tuple[int, int]] = None,
+    max_repeated_siblings: int = 0,
+) -> list:
+    """
+    Reduces a UI hierarchy to its visible, non-repetitive part: drops off-screen elements when
+    the screen size is given, and collapses repeated siblings when `max_repeated_siblings` is
+    positive. Element properties are left untouched.
+    """
+    if screen_size is not None:
+        ui_hierarchy = cull_offscreen_elements(ui_hierarchy, screen_size)
+    if max_repeated_siblings > 0:
+        ui_hierarchy = collapse_repeated_siblings(ui_hierarchy, max_repeated_siblings)
+    return ui_hierarchy
+
+
+# Side of the square cells of the grid UIHierarchyIndex locates elements with, in pixels
+INDEX_GRID_CELL_SIZE = 200
+# Elements spanning more cells than this (e.g. huge scroll contents) are kept out of the grid
+INDEX_GRID_MAX_ELEMENT_CELLS = 256
+
+
+class UIHierarchyIndex:
+    """
+    Flattened, indexed view of a UI hierarchy, for repeated lookups on the same frame.
+    Elements are kept in depth-first order along with their parent and bounds; lookups by
+    resource-id, text and accessibility text are dict lookups returning the first match in
+    that order, as find_element_by_resource_id does.
+    Literal Maestro selectors are looked up by their case-folded values, and point lookups go
+    through a grid of INDEX_GRID_CELL_SIZE cells listing the elements overlapping each one.
+    """
+
+    def __init__(self, ui_hierarchy: list):
+        self.ui_hierarchy = ui_hierarchy
+        self.elements: list[dict] = []
+        self.parents: list[Optional[int]] = []
+        self.bounds: list[Optional[tuple[int, int, int, int]]] = []
+        self._positions: dict[int, int] = {}
+        self._by_key: dict[str, dict[str, list[int]]] = {
+            "resourceId": {},
+            "text": {},
+            "accessibilityText": {},
+        }
+        # case-folded values matched by selectors: resource-ids, their last part, and texts
+        self._by_selector_id: dict[str, list[int]] = {}
+        self._by_selector_text: dict[str, list[int]] = {}
+        self._grid: dict[tuple[int, int], list[int]] = {}
+        self._off_grid: list[int] = []
+        self._marks: Optional[dict[int, dict]] = None
+
+        def add(elements: list, parent: Optional[int]):
+            for element in elements:
+                if not isinstance(element, dict):
+                    continue
+                position = len(self.elements)
+                self.elements.append(element)
+                self.parents.append(parent)
+                self.bounds.append(get_element_bounds(element))
+                self._positions[id(element)] = position
+                for key, positions_by_value in self._by_key.items():
+                    value = element.get(key)
+                    if isinstance(value, str) and value:
+                        positions_by_value.setdefault(value, []).append(position)
+                self._add_selector_values(element, position)
+                self._add_to_grid(position)
+                children = element.get("children")
+                if isinstance(children, list):
+                    add(children, position)
+
+        add(ui_hierarchy, None)
+
+    def _add_selector_values(self, element: dict, position: int):
+        resource_id = element.get("resourceId")
+        if isinstance(resource_id, str) and resource_id:
+            for value in {resource_id.lower(), resource_id.rsplit("/", 1)[-1].lower()}:
+                self._by_selector_id.setdefault(value, []).append(position)
+        texts = {element.get(key) for key in TEXT_ELEMENT_KEYS}
+        for value in {text.lower() for text in texts if isinstance(text, str) and text}:
+            self._by_selector_text.setdefault(value, []).append(position)
+
+    def _add_to_grid(self, position: int):
+        bounds = self.bounds[position]
+        if bounds is None:
+            return
+        # cells of the top-left and bottom-right pixels, bounds excluding their right and bottom
+        left, top, right, bottom = bounds
+        left, top = left // INDEX_GRID_CELL_SIZE, top // INDEX_GRID_CELL_SIZE
+        right, bottom = (right - 1) // INDEX_GRID_CELL_SIZE, (bottom - 1) // INDEX_GRID_CELL_SIZE
+        if (right - left + 1) * (bottom - top + 1) > INDEX_GRID_MAX_ELEMENT_CELLS:
+            self._off_grid.append(position)
+            return
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                self._grid.setdefault((column, row), []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def _find_all(self, key: str, value: str) -> list[dict]:
+        return [self.elements[position] for position in self._by_key[key].get(value, [])]
+
+    def find_all_by_resource_id(self, resource_id: str) -> list[dict]:
+        return self._find_all("resourceId", resource_id)
+
+    def find_by_resource_id(self, resource_id: str) -> Optional[dict]:
+        return next(iter(self.find_all_by_resource_id(resource_id)), None)
+
+    def find_all_by_text(self, text: str) -> list[dict]:
+        return self._find_all("text", text)
+
+    def find_by_text(self, text: str) -> Optional[dict]:
+        return next(iter(self.find_all_by_text(text)), None)
+
+    def find_all_by_accessibility_text(self, accessibility_text: str) -> list[dict]:
+        return self._find_all("accessibilityText", accessibility_text)
+
+    def get_parent(self, element: dict) -> Optional[dict]:
+        position = self._positions.get(id(element))
+        if position is None:
+            return None
+        parent = self.parents[position]
+        return self.elements[parent] if parent is not None else None
+
+    def find_at_point(self, x: int, y: int) -> Optional[dict]:
+        """Deepest (last drawn) element whose bounds contain the point."""
+        cell = (x // INDEX_GRID_CELL_SIZE, y // INDEX_GRID_CELL_SIZE)
+        found = None
+        for position in chain(self._grid.get(cell, []), self._off_grid):
+            bounds = self.bounds[position]
+            if (
+                (found is None or position > found)
+                and bounds is not None
+                and bounds[0] <= x < bounds[2]
+                and bounds[1] <= y < bounds[3]
+            ):
+                found = position
+        return self.elements[found] if found is not None else None
+
+    def find_all_by_selector(
+        self, resource_id: Optional[str] = None, text: Optional[str] = None
+    ) -> list[dict]:
+        """
+        Same as find_elements_by_selector on the indexed hierarchy. Literal selector values are
+        looked up, regexes are matched against every element.
+        """
+        candidates: Optional[set[int]] = None
+        for value, positions_by_value in (
+            (resource_id, self._by_selector_id),
+            (text, self._by_selector_text),
+        ):
+            if value is not None and is_literal_selector_value(value):
+                positions = set(positions_by_value.get(value.lower(), []))
+                candidates = positions if candidates is None else candidates & positions
+        elements = (
+            self.elements
+            if candidates is None
+            else [self.elements[position] for position in sorted(candidates)]
+        )
+        return _sort_selector_matches(
+            element
+            for element in elements
+            if _matches_selector(element, resource_id=resource_id, text=text)
+        )
+
+    def get_element_by_mark(self, mark: int) -> Optional[dict]:
+        """Element of the given mark (see get_element_marks), numbered on first use."""
+        if self._marks is None:
+            self._marks = get_element_marks(self.ui_hierarchy)
+        return self._marks.get(mark)